@@ -3,17 +3,21 @@ Application de recommandation de films avec IA
 """
 
 import streamlit as st
+import numpy as np
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Seul le questionnaire est importé au démarrage : les modules lourds
+# (torch/sentence-transformers, google-generativeai, plotly) ne sont chargés
+# qu'au premier usage pour raccourcir le cold start Streamlit
 from src.questionnaire import QuestionnaireManager
-from src.nlp_engine import NLPEngine
-from src.scoring import ScoringSystem
-from src.genai_integration import GenAIIntegration
-from src.visualization import VisualizationManager
 
+# WARNING par défaut en production ; LOG_LEVEL=INFO pour le debug local
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get("LOG_LEVEL", "WARNING"),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
@@ -25,176 +29,397 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-st.markdown("""
-<style>
-    [data-testid="stSidebar"] {
-        display: none;
-    }
-    
-    .stApp {
-        background: linear-gradient(180deg, #0a0a0a 0%, #1a1a2e 50%, #16213e 100%);
-    }
-    
-    .main .block-container {
-        background: linear-gradient(180deg, #1a1a2e 0%, #0f3460 100%);
-        border-radius: 20px;
-        padding: 2.5rem;
-        box-shadow: 0 20px 60px rgba(0, 0, 0, 0.5);
-        border: 1px solid rgba(14, 165, 233, 0.2);
-    }
-    
-    /* Header principal avec gradient cyan-bleu */
-    .main-header {
-        font-size: 3.5rem;
-        font-weight: 800;
-        text-align: center;
-        background: linear-gradient(135deg, #0ea5e9 0%, #06b6d4 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        margin-bottom: 0.5rem;
-        padding: 1rem 0;
-        filter: drop-shadow(0 0 20px rgba(14, 165, 233, 0.3));
-    }
-    
-    /* Sous-titre elegant */
-    .sub-header {
-        text-align: center;
-        color: #94a3b8;
-        font-size: 1.2rem;
-        margin-bottom: 3rem;
-        font-weight: 300;
-    }
-    
-    /* Boutons modernes avec gradient cyan */
-    .stButton>button {
-        width: 100%;
-        background: linear-gradient(135deg, #0ea5e9 0%, #06b6d4 100%);
-        color: white;
-        border: none;
-        border-radius: 12px;
-        padding: 0.75rem 2rem;
-        font-size: 1.1rem;
-        font-weight: 600;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(14, 165, 233, 0.4);
-    }
-    
-    .stButton>button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 25px rgba(14, 165, 233, 0.6);
-        background: linear-gradient(135deg, #06b6d4 0%, #0ea5e9 100%);
-    }
-    
-    /* Tabs modernes sombres */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-        background: rgba(15, 23, 42, 0.8);
-        padding: 0.5rem;
-        border-radius: 12px;
-        border: 1px solid rgba(14, 165, 233, 0.2);
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        border-radius: 8px;
-        padding: 0.75rem 1.5rem;
-        font-weight: 600;
-        color: #94a3b8;
-        background: transparent;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background: linear-gradient(135deg, #0ea5e9 0%, #06b6d4 100%);
-        color: white !important;
-    }
-    
-    /* Cards et containers sombres */
-    .stExpander {
-        border: 1px solid rgba(14, 165, 233, 0.3);
-        border-radius: 12px;
-        background: rgba(15, 23, 42, 0.6);
-        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.3);
-    }
-    
-    /* Metriques modernes avec couleur cyan */
-    [data-testid="stMetricValue"] {
-        font-size: 2rem;
-        font-weight: 700;
-        background: linear-gradient(135deg, #0ea5e9 0%, #06b6d4 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-    }
-    
-    /* Messages info avec theme sombre */
-    .stInfo {
-        background: rgba(14, 165, 233, 0.1);
-        border-left: 4px solid #0ea5e9;
-        border-radius: 12px;
-        color: #e0f2fe;
-    }
-    
-    .stSuccess {
-        background: rgba(34, 197, 94, 0.1);
-        border-left: 4px solid #22c55e;
-        border-radius: 12px;
-        color: #dcfce7;
-    }
-    
-    .stWarning {
-        background: rgba(245, 158, 11, 0.1);
-        border-left: 4px solid #f59e0b;
-        border-radius: 12px;
-        color: #fef3c7;
-    }
-    
-    .stError {
-        background: rgba(239, 68, 68, 0.1);
-        border-left: 4px solid #ef4444;
-        border-radius: 12px;
-        color: #fee2e2;
-    }
-    
-    /* Espacement global */
-    .block-container {
-        padding-top: 2rem;
-        padding-bottom: 2rem;
-        max-width: 1200px;
-    }
-    
-    /* Inputs et selects theme sombre */
-    .stTextInput input, .stTextArea textarea, .stSelectbox select {
-        background: rgba(15, 23, 42, 0.8);
-        border: 1px solid rgba(14, 165, 233, 0.3);
-        border-radius: 8px;
-        color: #e2e8f0;
-        transition: all 0.3s ease;
-    }
-    
-    .stTextInput input:focus, .stTextArea textarea:focus, .stSelectbox select:focus {
-        border-color: #0ea5e9;
-        box-shadow: 0 0 0 3px rgba(14, 165, 233, 0.2);
-        background: rgba(15, 23, 42, 0.9);
-    }
-    
-    /* Labels en clair pour contraste */
-    label {
-        color: #cbd5e1 !important;
-    }
-    
-    /* Texte general */
-    .stMarkdown, p, span {
-        color: #cbd5e1;
-    }
-    
-    h1, h2, h3, h4, h5, h6 {
-        color: #e2e8f0;
-    }
-    
-    /* Separateurs */
-    hr {
-        border-color: rgba(14, 165, 233, 0.2);
+STYLE_PATH = Path(__file__).parent / 'assets' / 'style.css'
+
+
+def _resolve_referentiel_path() -> str:
+    """
+    Chemin du référentiel, résolu une seule fois (clé de cache stable)
+
+    Préfère la version Parquet (colonnaire, typée, ~5-10x plus rapide à
+    charger — voir scripts/convert_referentiel.py) et retombe sur le CSV.
+    """
+    data_dir = Path(__file__).parent / 'data'
+    parquet = data_dir / 'films_referentiel.parquet'
+    if parquet.exists():
+        return str(parquet.resolve())
+    return str((data_dir / 'films_referentiel.csv').resolve())
+
+
+CSV_PATH = _resolve_referentiel_path()
+
+
+@st.cache_data
+def load_css() -> str:
+    """Charge la feuille de style une seule fois par worker"""
+    return STYLE_PATH.read_text(encoding='utf-8')
+
+
+# Le DOM conserve la balise <style> entre les reruns : injecter une seule fois
+if not st.session_state.get("_css_injected"):
+    st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
+    st.session_state["_css_injected"] = True
+
+
+@st.cache_resource
+def get_nlp_engine() -> "NLPEngine":
+    """Retourne le moteur NLP (modèle SBERT chargé une seule fois par worker)"""
+    from src.nlp_engine import NLPEngine
+    return NLPEngine(quantize_int8=True)
+
+
+@st.cache_resource
+def get_questionnaire_manager() -> QuestionnaireManager:
+    """Retourne le gestionnaire de questionnaire (listes construites une fois)"""
+    return QuestionnaireManager()
+
+
+@st.cache_resource
+def get_scoring_system(alpha: float = 0.50, beta: float = 0.30, gamma: float = 0.20) -> "ScoringSystem":
+    """Retourne le système de scoring (singleton par pondération)"""
+    from src.scoring import ScoringSystem
+    return ScoringSystem(alpha=alpha, beta=beta, gamma=gamma)
+
+
+@st.cache_resource
+def get_genai() -> "GenAIIntegration":
+    """Retourne l'intégration Gemini (client, cache et moteur NLP partagés)"""
+    from src.genai_integration import GenAIIntegration
+    return GenAIIntegration(nlp_engine=get_nlp_engine())
+
+
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """Executor partagé pour sortir le pipeline du thread Streamlit"""
+    return ThreadPoolExecutor(max_workers=4)
+
+
+@st.cache_data(show_spinner=False)
+def load_referentiel_cached(csv_path: str):
+    """Charge le référentiel de films une seule fois (CSV + texte complet)"""
+    return get_nlp_engine().load_referentiel(csv_path)
+
+
+# Seuls ces champs alimentent get_text_for_analysis ; timestamp et version
+# sont exclus de la clé de cache (le timestamp change à chaque soumission
+# et rendait la mémoïsation inopérante)
+_TEXT_FIELDS = (
+    'description_libre', 'preferences_genres', 'preferences_moods',
+    'realisateurs_favoris', 'films_references', 'periode_preferee',
+    'elements_a_eviter'
+)
+
+
+@st.cache_data(show_spinner=False)
+def _compiled_user_text_cached(text_responses: dict) -> str:
+    """
+    Texte d'analyse SBERT compilé depuis les réponses (mémoïsé)
+
+    Premier étage du cache à deux niveaux : tant que les réponses ne
+    changent pas, ni la compilation du texte ni l'embedding SBERT aval
+    (adressé par hash du texte dans NLPEngine) ne sont recalculés.
+    """
+    return get_questionnaire_manager().get_text_for_analysis(text_responses)
+
+
+def compiled_user_text(responses: dict) -> str:
+    """Projette les réponses sur les champs textuels avant la mémoïsation"""
+    return _compiled_user_text_cached(
+        {field: responses[field] for field in _TEXT_FIELDS if field in responses}
+    )
+
+
+@st.cache_data
+def build_scores_rows(top_3_rows: tuple) -> list:
+    """
+    Construit le tableau des scores détaillés (mémoïsé entre reruns)
+
+    Retourne une liste de dicts que st.dataframe accepte directement :
+    inutile de payer la construction d'un DataFrame pandas pour 3 lignes.
+    """
+    return [
+        {
+            'Rang': rang,
+            'Film': titre,
+            'Score Final': f"{score_final:.3f}",
+            'Sémantique': f"{semantique:.3f}",
+            'Genre': f"{genre:.3f}",
+            'Mood': f"{mood:.3f}"
+        }
+        for rang, titre, score_final, semantique, genre, mood in top_3_rows
+    ]
+
+
+@st.fragment
+def render_top3_tab(viz: "VisualizationManager", results: dict):
+    """Onglet 1 - Les 3 meilleurs films recommandes"""
+    st.markdown("### Vos 3 Films Recommandés")
+
+    for film in results['top_3']:
+        viz.display_film_card(film, film['rang'])
+
+
+@st.fragment
+def render_viz_tab(viz: "VisualizationManager", results: dict):
+    """Onglet 2 - Graphiques et visualisations"""
+    st.markdown("### Analyse Visuelle de votre Profil")
+
+    # st.toggle plutôt qu'un expander : le corps d'un expander s'exécute
+    # même replié, alors qu'ici la figure n'est construite ni sérialisée
+    # tant que le tableau de bord n'est pas demandé (même motif que les
+    # scores détaillés de l'onglet statistiques)
+    if st.toggle("Afficher le tableau de bord", value=False, key="show_dashboard"):
+        # Une seule figure combinée : un seul message Plotly vers le frontend
+        viz.render_dashboard(
+            results['genre_weights'],
+            results['mood_weights'],
+            results['top_3'],
+            results['genre_distribution']
+        )
+
+    st.markdown("### Statistiques de Couverture")
+    viz.display_coverage_stats(results['coverage_stats'])
+
+
+@st.fragment
+def render_profile_tab(viz: "VisualizationManager", results: dict):
+    """Onglet 3 - Profil personnalise genere par l'IA"""
+    st.markdown("### Votre Profil Cinéphile")
+    st.info("Généré par l'IA Gemini (1 appel API - EF4.3)")
+
+    st.markdown(results['cinephile_profile'])
+
+    st.markdown("---")
+    st.markdown(f"**Score d'Affinité Global:** {results['coverage_score']:.1%}")
+
+    # Interpreter le score pour l'utilisateur
+    if results['coverage_score'] >= 0.7:
+        st.success("Excellent ! Vos goûts sont très bien définis.")
+    elif results['coverage_score'] >= 0.5:
+        st.info("Bon profil cinématographique avec de la diversité.")
+    else:
+        st.warning("Profil varié ! Vous êtes ouvert à de nombreux styles.")
+
+
+@st.fragment
+def render_plan_tab(viz: "VisualizationManager", results: dict):
+    """Onglet 4 - Plan de decouverte personnalise"""
+    st.markdown("### Plan de Découverte Personnalisé")
+    st.info("Généré par l'IA Gemini (1 appel API - EF4.2)")
+
+    st.markdown(results['discovery_plan'])
+
+    if results['weak_genres']:
+        st.markdown("### Genres à Explorer")
+        cols = st.columns(len(results['weak_genres'][:5]))
+        for idx, genre in enumerate(results['weak_genres'][:5]):
+            with cols[idx]:
+                st.metric(f"Genre #{idx+1}", genre)
+
+
+@st.fragment
+def render_stats_tab(viz: "VisualizationManager", results: dict):
+    """Onglet 5 - Details techniques et statistiques"""
+    st.markdown("### Détails Techniques de l'Analyse")
+
+    st.markdown("#### Analyse Sémantique (SBERT)")
+    st.json({
+        "Modèle": "paraphrase-multilingual-MiniLM-L12-v2",
+        "Type": "Sentence-BERT (Embeddings Contextuels)",
+        "Mesure": "Similarité Cosinus",
+        "Films analysés": results['coverage_stats']['total_films']
+    })
+
+    st.markdown("#### Système de Scoring")
+    st.code("""
+Formule de Score Final:
+Score = 0.50 × Similarité_Sémantique 
+      + 0.30 × Score_Genre
+      + 0.20 × Score_Mood
+
+Où tous les scores sont normalisés dans [0, 1]
+    """)
+
+    st.markdown("#### Utilisation de l'IA Générative")
+    viz.display_api_usage(results['api_stats'])
+
+    st.markdown("#### Données Brutes")
+    # st.toggle au lieu d'un expander : rien n'est sérialisé tant que c'est fermé
+    if st.toggle("Voir les scores détaillés", key="show_scores_expanded"):
+        scores_rows = build_scores_rows(tuple(
+            (r['rang'], r['titre'], r['score_final'],
+             r['composantes']['sémantique'], r['composantes']['genre'], r['composantes']['mood'])
+            for r in results['top_3']
+        ))
+        st.dataframe(scores_rows, use_container_width=True)
+
+
+def run_analysis_pipeline(questionnaire, responses, user_text, nlp_engine, scoring_system, genai, referentiel) -> dict:
+    """
+    Pipeline d'analyse complet (pur calcul, exécutable hors du thread Streamlit)
+
+    Le texte utilisateur est compilé en amont (compiled_user_text, mémoïsé
+    par st.cache_data) car st.cache_data n'est pas utilisable hors du
+    thread du script-runner.
+
+    Returns:
+        Dictionnaire de résultats à stocker dans la session
+    """
+    # Enrichir le texte si trop court avec l'IA
+    user_text, _ = genai.enrich_short_text(user_text, min_words=15)
+
+    # Analyse semantique avec SBERT
+    recommendations, similarities = nlp_engine.analyze_user_input(user_text, top_n=3)
+
+    # Calculer les scores ponderes
+    genre_weights = questionnaire.get_genre_weights(responses)
+    mood_weights = questionnaire.get_mood_weights(responses)
+
+    ranked_recommendations = scoring_system.rank_films(
+        recommendations=recommendations,
+        semantic_similarities=similarities,
+        user_genre_weights=genre_weights,
+        user_mood_weights=mood_weights,
+        referentiel=referentiel
+    )
+
+    # Recuperer le top 3 des films
+    top_3 = scoring_system.get_top_recommendations(ranked_recommendations, top_n=3)
+
+    # Calculer les statistiques
+    coverage_stats = nlp_engine.get_coverage_stats(similarities)
+    genre_distribution = nlp_engine.get_genre_distribution(similarities, threshold=0.5)
+    coverage_score = scoring_system.calculate_coverage_score(
+        similarities, genre_weights, mood_weights, referentiel
+    )
+    weak_genres = scoring_system.identify_weak_genres(similarities, referentiel, threshold=0.4)
+
+    # Generation avec l'IA Gemini
+    top_genres = questionnaire.get_top_preferences(genre_weights, k=3)
+    top_moods = questionnaire.get_top_preferences(mood_weights, k=3)
+    user_profile_summary = f"Genres préférés: {', '.join(top_genres)}. Moods: {', '.join(top_moods)}."
+
+    # Generer le plan et le profil en 1 seul appel API fusionne
+    discovery_plan, cinephile_profile = genai.generate_profile_and_plan(
+        weak_genres, top_3, user_profile_summary,
+        genre_weights, mood_weights, coverage_score
+    )
+
+    return {
+        'top_3': top_3,
+        'all_recommendations': ranked_recommendations,
+        'similarities': similarities,
+        'coverage_stats': coverage_stats,
+        'genre_distribution': genre_distribution,
+        'coverage_score': coverage_score,
+        'weak_genres': weak_genres,
+        'discovery_plan': discovery_plan,
+        'cinephile_profile': cinephile_profile,
+        'genre_weights': genre_weights,
+        'mood_weights': mood_weights,
+        'api_stats': genai.get_api_stats()
     }
-</style>
-""", unsafe_allow_html=True)
+
+
+def warm_up_components():
+    """
+    Pré-chauffe le modèle SBERT et le client Gemini au démarrage
+
+    Déplace le coût de chargement des poids et de l'initialisation des
+    kernels hors du premier clic utilisateur ; une seule fois par session
+    (et une seule fois par worker grâce à st.cache_resource).
+    """
+    if "app_warmed" in st.session_state:
+        return
+
+    try:
+        engine = get_nlp_engine()
+        engine.model.encode(["warmup"], show_progress_bar=False)
+        get_genai()
+        # Charger le référentiel et toucher la première ligne des embeddings :
+        # amorce le cache de pages de l'OS pour le fichier .npy mappé
+        load_referentiel_cached(CSV_PATH)
+        embeddings = engine.encode_referentiel()
+        _ = np.asarray(embeddings[:1]).copy()
+    except Exception as e:
+        logger.warning("Pré-chauffage incomplet: %s", e)
+
+    st.session_state["app_warmed"] = True
+
+
+@st.fragment
+def render_questionnaire_section():
+    """
+    Questionnaire + bouton d'analyse, isolés dans un fragment
+
+    Chaque mouvement de slider ne réexécute que ce fragment au lieu de
+    main() en entier ; le passage aux résultats force un rerun complet.
+    """
+    st.markdown("## Questionnaire de Préférences")
+    st.markdown("Répondez aux questions ci-dessous pour obtenir vos recommandations personnalisées.")
+
+    questionnaire = get_questionnaire_manager()
+    # Le questionnaire est un st.form : responses vaut None tant que le
+    # formulaire n'est pas soumis, aucun rerun par mouvement de slider
+    responses = questionnaire.render_questionnaire()
+
+    # Bouton de reinitialisation si deja analyse
+    if st.session_state.get('recommendations'):
+        col1, col2, col3 = st.columns([1, 1, 1])
+        with col2:
+            if st.button("Nouvelle Analyse", use_container_width=True):
+                st.session_state.responses = None
+                st.session_state.recommendations = None
+                st.session_state.analysis_done = False
+                st.rerun()
+
+    if responses is not None:
+        # Valider les réponses
+        is_valid, message = questionnaire.validate_responses(responses)
+
+        if not is_valid:
+            st.error(message)
+        else:
+            st.success(message)
+
+            # Sauvegarder les reponses de l'utilisateur
+            questionnaire.save_responses(responses)
+
+            # Stocker les reponses dans la session
+            st.session_state.responses = responses
+
+            # Lancer le pipeline dans un thread de fond pour ne pas bloquer
+            # le script-runner Streamlit pendant l'analyse
+            with st.status("Analyse en cours...", expanded=True) as status:
+                try:
+                    status.update(label="Initialisation des composants...")
+                    nlp_engine = get_nlp_engine()
+                    scoring_system = get_scoring_system(alpha=0.50, beta=0.30, gamma=0.20)
+                    genai = get_genai()
+                    referentiel = load_referentiel_cached(CSV_PATH)
+                    # Compilé dans le thread Streamlit pour profiter du cache
+                    user_text = compiled_user_text(responses)
+
+                    status.update(label="Analyse sémantique, scoring et génération IA...")
+                    future = get_executor().submit(
+                        run_analysis_pipeline,
+                        questionnaire, responses, user_text,
+                        nlp_engine, scoring_system, genai, referentiel
+                    )
+                    while not future.done():
+                        time.sleep(0.2)
+
+                    st.session_state.recommendations = future.result()
+                    status.update(label="Analyse terminée !", state="complete")
+
+                    st.session_state.analysis_done = True
+                    # Rerun complet : main() doit basculer sur la vue résultats
+                    st.rerun(scope="app")
+
+                except Exception as e:
+                    status.update(label="Erreur lors de l'analyse", state="error")
+                    st.error(f"Erreur lors de l'analyse: {str(e)}")
+                    logger.error("Erreur analyse: %s", e, exc_info=True)
 
 
 def initialize_session_state():
@@ -211,7 +436,8 @@ def main():
     """Fonction principale de l'application"""
     
     initialize_session_state()
-    
+    warm_up_components()
+
     # Header principal avec badge de projet
     st.markdown('<h1 class="main-header">AISCA-Cinema</h1>', unsafe_allow_html=True)
     st.markdown(
@@ -228,132 +454,12 @@ def main():
     
     # Etape 1 - Affichage du questionnaire
     if not st.session_state.analysis_done:
-        st.markdown("## Questionnaire de Préférences")
-        st.markdown("Répondez aux questions ci-dessous pour obtenir vos recommandations personnalisées.")
-        
-        questionnaire = QuestionnaireManager()
-        responses = questionnaire.render_questionnaire()
-        
-        st.markdown("---")
-        
-        # Bouton d'analyse centre
-        col1, col2, col3 = st.columns([1, 1, 1])
-        with col2:
-            analyze_button = st.button("Analyser mes Préférences", type="primary", use_container_width=True)
-        
-        # Bouton de reinitialisation si deja analyse
-        if st.session_state.get('recommendations'):
-            col1, col2, col3 = st.columns([1, 1, 1])
-            with col2:
-                if st.button("Nouvelle Analyse", use_container_width=True):
-                    st.session_state.responses = None
-                    st.session_state.recommendations = None
-                    st.session_state.analysis_done = False
-                    st.rerun()
-        
-        if analyze_button:
-            # Valider les réponses
-            is_valid, message = questionnaire.validate_responses(responses)
-            
-            if not is_valid:
-                st.error(message)
-            else:
-                st.success(message)
-                
-                # Sauvegarder les reponses de l'utilisateur
-                questionnaire.save_responses(responses)
-                
-                # Stocker les reponses dans la session
-                st.session_state.responses = responses
-                
-                # Lancer le processus d'analyse
-                with st.spinner("Analyse en cours... Veuillez patienter."):
-                    try:
-                        # Etape 1 - Initialiser les composants necessaires
-                        st.toast("Initialisation des composants...")
-                        nlp_engine = NLPEngine()
-                        scoring_system = ScoringSystem(alpha=0.50, beta=0.30, gamma=0.20)
-                        genai = GenAIIntegration()
-                        
-                        # Etape 2 - Charger la base de donnees de films
-                        st.toast("Chargement du référentiel de films...")
-                        csv_path = Path(__file__).parent / 'data' / 'films_referentiel.csv'
-                        referentiel = nlp_engine.load_referentiel(str(csv_path))
-                        
-                        # Etape 3 - Preparer le texte utilisateur pour l'analyse
-                        user_text = questionnaire.get_text_for_analysis(responses)
-                        
-                        # Etape 4 - Enrichir le texte si trop court avec l'IA
-                        user_text, was_enriched = genai.enrich_short_text(user_text, min_words=15)
-                        if was_enriched:
-                            st.toast("Description enrichie par l'IA")
-                        
-                        # Etape 5 - Analyse semantique avec SBERT
-                        st.toast("Analyse sémantique avec SBERT...")
-                        recommendations, similarities = nlp_engine.analyze_user_input(user_text, top_n=3)
-                        
-                        # Etape 6 - Calculer les scores ponderes
-                        st.toast("Calcul des scores finaux...")
-                        genre_weights = questionnaire.get_genre_weights(responses)
-                        mood_weights = questionnaire.get_mood_weights(responses)
-                        
-                        ranked_recommendations = scoring_system.rank_films(
-                            recommendations=recommendations,
-                            semantic_similarities=similarities,
-                            user_genre_weights=genre_weights,
-                            user_mood_weights=mood_weights,
-                            referentiel=referentiel
-                        )
-                        
-                        # Etape 7 - Recuperer le top 3 des films
-                        top_3 = scoring_system.get_top_recommendations(ranked_recommendations, top_n=3)
-                        
-                        # Etape 8 - Calculer les statistiques
-                        coverage_stats = nlp_engine.get_coverage_stats(similarities)
-                        genre_distribution = nlp_engine.get_genre_distribution(similarities, threshold=0.5)
-                        coverage_score = scoring_system.calculate_coverage_score(
-                            similarities, genre_weights, mood_weights, referentiel
-                        )
-                        weak_genres = scoring_system.identify_weak_genres(similarities, referentiel, threshold=0.4)
-                        
-                        # Etape 9 - Generation avec l'IA Gemini
-                        st.toast("Génération du profil et du plan...")
-                        
-                        # Generer le plan de decouverte avec 1 seul appel API
-                        user_profile_summary = f"Genres préférés: {', '.join([g for g, w in sorted(genre_weights.items(), key=lambda x: x[1], reverse=True)[:3]])}. Moods: {', '.join([m for m, w in sorted(mood_weights.items(), key=lambda x: x[1], reverse=True)[:3]])}."
-                        discovery_plan = genai.generate_discovery_plan(weak_genres, top_3, user_profile_summary)
-                        
-                        # Generer le profil cinephile avec 1 seul appel API
-                        cinephile_profile = genai.generate_cinephile_profile(
-                            top_3, genre_weights, mood_weights, coverage_score
-                        )
-                        
-                        # Sauvegarder tous les resultats
-                        st.session_state.recommendations = {
-                            'top_3': top_3,
-                            'all_recommendations': ranked_recommendations,
-                            'similarities': similarities,
-                            'coverage_stats': coverage_stats,
-                            'genre_distribution': genre_distribution,
-                            'coverage_score': coverage_score,
-                            'weak_genres': weak_genres,
-                            'discovery_plan': discovery_plan,
-                            'cinephile_profile': cinephile_profile,
-                            'genre_weights': genre_weights,
-                            'mood_weights': mood_weights,
-                            'api_stats': genai.get_api_stats()
-                        }
-                        
-                        st.session_state.analysis_done = True
-                        st.success("Analyse terminée !")
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Erreur lors de l'analyse: {str(e)}")
-                        logger.error(f"Erreur analyse: {e}", exc_info=True)
-    
+        render_questionnaire_section()
+
     # Etape 2 - Affichage des resultats
     else:
+        from src.visualization import VisualizationManager
+
         viz = VisualizationManager()
         results = st.session_state.recommendations
         responses = st.session_state.responses
@@ -380,104 +486,20 @@ def main():
             "Statistiques"
         ])
         
-        # Onglet 1 - Les 3 meilleurs films recommandes
         with tab1:
-            st.markdown("### Vos 3 Films Recommandés")
-            
-            for film in results['top_3']:
-                viz.display_film_card(film, film['rang'])
-        
-        # Onglet 2 - Graphiques et visualisations
+            render_top3_tab(viz, results)
+
         with tab2:
-            st.markdown("### Analyse Visuelle de votre Profil")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                viz.plot_genre_radar(results['genre_weights'])
-            
-            with col2:
-                viz.plot_mood_radar(results['mood_weights'])
-            
-            viz.plot_recommendation_scores(results['top_3'])
-            
-            viz.plot_genre_distribution(results['genre_distribution'])
-            
-            st.markdown("### Statistiques de Couverture")
-            viz.display_coverage_stats(results['coverage_stats'])
-        
-        # Onglet 3 - Profil personnalise genere par l'IA
+            render_viz_tab(viz, results)
+
         with tab3:
-            st.markdown("### Votre Profil Cinéphile")
-            st.info("Généré par l'IA Gemini (1 appel API - EF4.3)")
-            
-            st.markdown(results['cinephile_profile'])
-            
-            st.markdown("---")
-            st.markdown(f"**Score d'Affinité Global:** {results['coverage_score']:.1%}")
-            
-            # Interpreter le score pour l'utilisateur
-            if results['coverage_score'] >= 0.7:
-                st.success("Excellent ! Vos goûts sont très bien définis.")
-            elif results['coverage_score'] >= 0.5:
-                st.info("Bon profil cinématographique avec de la diversité.")
-            else:
-                st.warning("Profil varié ! Vous êtes ouvert à de nombreux styles.")
-        
-        # Onglet 4 - Plan de decouverte personnalise
+            render_profile_tab(viz, results)
+
         with tab4:
-            st.markdown("### Plan de Découverte Personnalisé")
-            st.info("Généré par l'IA Gemini (1 appel API - EF4.2)")
-            
-            st.markdown(results['discovery_plan'])
-            
-            if results['weak_genres']:
-                st.markdown("### Genres à Explorer")
-                cols = st.columns(len(results['weak_genres'][:5]))
-                for idx, genre in enumerate(results['weak_genres'][:5]):
-                    with cols[idx]:
-                        st.metric(f"Genre #{idx+1}", genre)
-        
-        # Onglet 5 - Details techniques et statistiques
-        with tab5:
-            st.markdown("### Détails Techniques de l'Analyse")
-            
-            st.markdown("#### Analyse Sémantique (SBERT)")
-            st.json({
-                "Modèle": "paraphrase-multilingual-MiniLM-L12-v2",
-                "Type": "Sentence-BERT (Embeddings Contextuels)",
-                "Mesure": "Similarité Cosinus",
-                "Films analysés": results['coverage_stats']['total_films']
-            })
-            
-            st.markdown("#### Système de Scoring")
-            st.code("""
-Formule de Score Final:
-Score = 0.50 × Similarité_Sémantique 
-      + 0.30 × Score_Genre
-      + 0.20 × Score_Mood
+            render_plan_tab(viz, results)
 
-Où tous les scores sont normalisés dans [0, 1]
-            """)
-            
-            st.markdown("#### Utilisation de l'IA Générative")
-            viz.display_api_usage(results['api_stats'])
-            
-            st.markdown("#### Données Brutes")
-            with st.expander("Voir les scores détaillés"):
-                import pandas as pd
-                df_scores = pd.DataFrame([
-                    {
-                        'Rang': r['rang'],
-                        'Film': r['titre'],
-                        'Score Final': f"{r['score_final']:.3f}",
-                        'Sémantique': f"{r['composantes']['sémantique']:.3f}",
-                        'Genre': f"{r['composantes']['genre']:.3f}",
-                        'Mood': f"{r['composantes']['mood']:.3f}"
-                    }
-                    for r in results['top_3']
-                ])
-                st.dataframe(df_scores, use_container_width=True)
+        with tab5:
+            render_stats_tab(viz, results)
     
     # Footer moderne et epure
     st.markdown("---")
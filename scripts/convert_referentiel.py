@@ -0,0 +1,32 @@
+"""
+Conversion unique du référentiel CSV vers Parquet
+
+Le format Parquet (colonnaire, typé, compressé) se charge ~5-10x plus vite
+que le CSV avec pandas. L'application préfère automatiquement le fichier
+.parquet s'il existe à côté du CSV.
+
+Nécessite pyarrow (moteur Parquet de pandas, voir requirements.txt).
+
+Usage:
+    python scripts/convert_referentiel.py
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+
+
+def main():
+    csv_path = DATA_DIR / 'films_referentiel.csv'
+    parquet_path = DATA_DIR / 'films_referentiel.parquet'
+
+    df = pd.read_csv(csv_path)
+    df.to_parquet(parquet_path, compression='zstd')
+
+    print(f"{len(df)} films convertis: {parquet_path}")
+
+
+if __name__ == '__main__':
+    main()
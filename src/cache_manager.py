@@ -5,143 +5,321 @@ Contrainte obligatoire : Implémentation d'un caching automatique
 Objectif : Limiter les coûts API et respecter le Free Tier de Gemini
 """
 
+import atexit
 import json
 import hashlib
+import re
+import sqlite3
+import numpy as np
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional, Dict
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Runs d'espaces/retours à la ligne, repliés avant hachage des clés
+_WHITESPACE_RE = re.compile(r"\s+")
+
 
 class CacheManager:
     """
     Gestion du cache pour les réponses GenAI
-    
+
     Respecte les contraintes:
     - Appels API strictement limités
     - Réutilisation automatique des réponses
-    - Persistance locale (JSON)
+    - Persistance locale SQLite en mode WAL : écritures transactionnelles
+      atomiques, insertions O(1), lecteurs concurrents entre sessions
+      Streamlit (le JSON partagé pouvait se corrompre sans verrouillage)
     """
-    
-    def __init__(self, cache_dir: str = ".cache", max_size: int = 100, enabled: bool = True):
+
+    def __init__(
+        self,
+        cache_dir: str = ".cache",
+        max_size: int = 100,
+        enabled: bool = True,
+        ttl_seconds: float = 24 * 3600
+    ):
         """
         Initialise le gestionnaire de cache
-        
+
         Args:
             cache_dir: Répertoire de stockage du cache
             max_size: Nombre maximum d'entrées dans le cache
             enabled: Activer/désactiver le cache
+            ttl_seconds: Durée de vie des entrées persistées (les réponses
+                plus anciennes sont purgées au démarrage ; 0 désactive le TTL)
         """
         self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(exist_ok=True)
-        self.cache_file = self.cache_dir / "genai_cache.json"
+        self.db_path = self.cache_dir / "genai_cache.db"
         self.max_size = max_size
+        self.conn = None
+        if enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(
+                self.db_path, isolation_level=None, check_same_thread=False
+            )
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA mmap_size=67108864")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "embedding TEXT, ts REAL NOT NULL) WITHOUT ROWID"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_ts ON cache(ts)")
+
+        # Embeddings normalisés des prompts cachés (clé -> vecteur), pour la
+        # recherche sémantique approchée en plus du match exact. Stockés en
+        # float16 : moitié moins de mémoire/disque, et le ranking cosinus
+        # SBERT est insensible à l'arrondi FP16
+        self.embeddings = {}
+        # Espace de noms (template de prompt) de chaque embedding : la
+        # recherche sémantique ne compare que des entrées issues du même
+        # template, jamais un plan de découverte contre un profil cinéphile
+        self.embedding_ns = {}
         self.cache = self._load_cache()
-        
+        # Entrées modifiées en mémoire mais pas encore écrites sur disque :
+        # les set() successifs d'une même analyse sont regroupés en un flush
+        self._pending = set()
+        atexit.register(self.flush)
+
         logger.info(f" CacheManager initialisé - Enabled: {enabled}, Max size: {max_size}")
-        
-    def _load_cache(self) -> Dict:
-        """Charge le cache depuis le fichier"""
+
+    def _load_cache(self) -> "OrderedDict[str, str]":
+        """Charge les entrées les plus récentes depuis la base SQLite"""
+        cache = OrderedDict()
         if not self.enabled:
-            return {}
-            
-        if self.cache_file.exists():
-            try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    logger.info(f" Cache chargé: {len(cache_data)} entrées")
-                    return cache_data
-            except Exception as e:
-                logger.warning(f" Erreur lors du chargement du cache: {e}")
-                return {}
-        return {}
-    
-    def _save_cache(self):
-        """Sauvegarde le cache dans le fichier"""
+            return cache
+
+        try:
+            if self.ttl_seconds > 0:
+                # Purger les réponses expirées : elles ne survivent ni aux
+                # changements de modèle ni aux évolutions de prompts
+                self.conn.execute(
+                    "DELETE FROM cache WHERE (julianday('now') - ts) * 86400.0 > ?",
+                    (self.ttl_seconds,)
+                )
+            rows = self.conn.execute(
+                "SELECT key, response, embedding FROM cache ORDER BY ts DESC LIMIT ?",
+                (self.max_size,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f" Erreur lors du chargement du cache: {e}")
+            return cache
+
+        # Les lignes arrivent de la plus récente à la plus ancienne ;
+        # on les insère en ordre inverse pour préserver l'ordre LRU
+        for key, response, embedding in reversed(rows):
+            cache[key] = response
+            if embedding:
+                data = json.loads(embedding)
+                # Ancien format : liste nue, sans espace de noms
+                if isinstance(data, dict):
+                    vec, ns = data["vec"], data.get("ns")
+                else:
+                    vec, ns = data, None
+                self.embeddings[key] = np.asarray(vec, dtype=np.float16)
+                self.embedding_ns[key] = ns
+
+        if cache:
+            logger.info(f" Cache chargé: {len(cache)} entrées")
+        return cache
+
+    def _save_entry(self, key: str, response: str):
+        """Écrit une seule entrée en base (INSERT OR REPLACE)"""
         if not self.enabled:
             return
-            
+
+        embedding = None
+        if key in self.embeddings:
+            embedding = json.dumps({
+                "ns": self.embedding_ns.get(key),
+                "vec": self.embeddings[key].tolist()
+            })
+
         try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
-            logger.debug(f" Cache sauvegardé: {len(self.cache)} entrées")
-        except Exception as e:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache(key, response, embedding, ts) "
+                "VALUES (?, ?, ?, julianday('now'))",
+                (key, response, embedding)
+            )
+            logger.debug(f" Entrée de cache écrite: {key[:12]}...")
+        except sqlite3.Error as e:
             logger.error(f" Erreur lors de la sauvegarde du cache: {e}")
-    
+
+    def _delete_entry(self, key: str):
+        """Supprime une entrée évincée de la base"""
+        if not self.enabled:
+            return
+        try:
+            self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f" Erreur lors de la suppression d'une entrée: {e}")
+
     def _generate_key(self, prompt: str, model: str = "gemini") -> str:
         """
         Génère une clé unique pour un prompt
-        
+
         Args:
             prompt: Le prompt à hasher
             model: Le modèle utilisé
-            
+
         Returns:
-            Clé de hash SHA-256
+            Clé de hash BLAKE2b (128 bits)
         """
-        content = f"{model}:{prompt}"
-        return hashlib.sha256(content.encode('utf-8')).hexdigest()
-    
+        # Normaliser les espaces avant hachage : deux prompts qui ne diffèrent
+        # que par l'indentation ou des retours à la ligne partagent la même clé
+        normalized = _WHITESPACE_RE.sub(" ", prompt.strip())
+        # La clé n'est pas une frontière de sécurité : BLAKE2b est nettement
+        # plus rapide que SHA-256 sur les longs prompts, et 128 bits suffisent
+        content = f"{model}:{normalized}"
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
     def get(self, prompt: str, model: str = "gemini") -> Optional[str]:
         """
         Récupère une réponse depuis le cache
-        
+
         Args:
             prompt: Le prompt recherché
             model: Le modèle utilisé
-            
+
         Returns:
             La réponse cachée ou None si non trouvée
         """
         if not self.enabled:
             return None
-            
+
         key = self._generate_key(prompt, model)
         response = self.cache.get(key)
-        
-        if response:
+
+        if response is not None:
+            # LRU : l'entrée consultée redevient la plus récente
+            self.cache.move_to_end(key)
             logger.info(f" Cache HIT - Réponse trouvée (longueur prompt: {len(prompt)} caractères)")
         else:
             logger.info(f" Cache MISS - Nouvel appel API nécessaire")
-            
+
         return response
-    
-    def set(self, prompt: str, response: str, model: str = "gemini"):
+
+    def set(self, prompt: str, response: str, model: str = "gemini", embedding=None, namespace: Optional[str] = None):
         """
         Ajoute une réponse au cache
-        
+
         Args:
             prompt: Le prompt
             response: La réponse à cacher
             model: Le modèle utilisé
+            embedding: Embedding de la partie dynamique du prompt (optionnel,
+                active la recherche sémantique pour les prompts reformulés)
+            namespace: Template d'origine de l'embedding ; la recherche
+                sémantique ne croise jamais deux espaces de noms différents
         """
         if not self.enabled:
             return
-            
+
         key = self._generate_key(prompt, model)
-        
-        # Si le cache est plein, supprimer l'entrée la plus ancienne (FIFO)
-        if len(self.cache) >= self.max_size:
-            oldest_key = next(iter(self.cache))
-            del self.cache[oldest_key]
-            logger.info(f"🗑️ Cache plein - Suppression de l'entrée la plus ancienne")
-        
+
+        # Si le cache est plein, évincer l'entrée la moins récemment utilisée
+        while len(self.cache) >= self.max_size:
+            oldest_key, _ = self.cache.popitem(last=False)
+            self.embeddings.pop(oldest_key, None)
+            self.embedding_ns.pop(oldest_key, None)
+            self._pending.discard(oldest_key)
+            self._delete_entry(oldest_key)
+            logger.info(f"🗑️ Cache plein - Éviction de l'entrée la plus ancienne")
+
+        if embedding is not None:
+            emb = np.asarray(embedding, dtype=np.float32).ravel()
+            norm = np.linalg.norm(emb)
+            if norm > 0:
+                # Normaliser en FP32 puis stocker en FP16
+                self.embeddings[key] = (emb / norm).astype(np.float16)
+                self.embedding_ns[key] = namespace
+
         self.cache[key] = response
-        self._save_cache()
+        self._pending.add(key)
         logger.info(f" Réponse ajoutée au cache (total: {len(self.cache)}/{self.max_size} entrées)")
-    
+
+    def flush(self):
+        """Écrit en base toutes les entrées en attente (une seule transaction)"""
+        if not self.enabled or not self._pending:
+            return
+
+        pending, self._pending = self._pending, set()
+        try:
+            self.conn.execute("BEGIN")
+            for key in pending:
+                if key in self.cache:
+                    self._save_entry(key, self.cache[key])
+            self.conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error(f" Erreur lors du flush du cache: {e}")
+        logger.debug(f" Cache flush: {len(pending)} entrée(s) écrite(s)")
+
+    def get_semantic(self, embedding, threshold: float = 0.95, namespace: Optional[str] = None) -> Optional[str]:
+        """
+        Recherche une réponse dont le prompt est sémantiquement équivalent
+
+        Compare l'embedding de la partie dynamique du prompt courant aux
+        embeddings des entrées en mémoire (similarité cosinus), restreints au
+        même espace de noms ; deux questionnaires reformulés mais équivalents
+        partagent ainsi la même réponse sans nouvel appel API.
+
+        Args:
+            embedding: Embedding du contenu recherché
+            threshold: Similarité cosinus minimale pour un hit
+            namespace: Seules les entrées de cet espace de noms sont comparées
+
+        Returns:
+            La réponse cachée la plus proche ou None
+        """
+        if not self.enabled or embedding is None or not self.embeddings:
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+        query = (query / norm).astype(np.float16)
+
+        keys = [k for k in self.embeddings if self.embedding_ns.get(k) == namespace]
+        if not keys:
+            return None
+        # Matmul en FP16 ; comparaison au seuil en FP32 pour éviter les ex æquo
+        sims = (np.stack([self.embeddings[k] for k in keys]) @ query).astype(np.float32)
+        best = int(np.argmax(sims))
+
+        if sims[best] >= threshold:
+            key = keys[best]
+            response = self.cache.get(key)
+            if response is not None:
+                self.cache.move_to_end(key)
+                logger.info(f" Cache HIT sémantique (similarité: {sims[best]:.3f})")
+                return response
+
+        return None
+
     def clear(self):
         """Vide le cache complètement"""
-        self.cache = {}
-        self._save_cache()
+        if self.enabled:
+            try:
+                self.conn.execute("DELETE FROM cache")
+            except sqlite3.Error as e:
+                logger.warning(f" Erreur lors du vidage du cache: {e}")
+        self.cache = OrderedDict()
+        self.embeddings = {}
+        self.embedding_ns = {}
+        self._pending = set()
         logger.info("🗑️ Cache vidé complètement")
-    
+
     def get_stats(self) -> Dict:
         """
         Retourne les statistiques du cache
-        
+
         Returns:
             Dictionnaire avec les stats
         """
@@ -150,10 +328,10 @@ class CacheManager:
             "entries": len(self.cache),
             "max_size": self.max_size,
             "usage_percent": round((len(self.cache) / self.max_size) * 100, 2) if self.max_size > 0 else 0,
-            "cache_file": str(self.cache_file),
-            "cache_exists": self.cache_file.exists()
+            "cache_dir": str(self.db_path),
+            "cache_exists": self.db_path.exists()
         }
-    
+
     def __repr__(self) -> str:
         stats = self.get_stats()
         return f"CacheManager(entries={stats['entries']}/{stats['max_size']}, enabled={stats['enabled']})"
@@ -9,7 +9,10 @@ Contraintes respectees:
 """
 
 import os
-from typing import List, Dict, Optional
+import asyncio
+import heapq
+import json
+from typing import Iterator, List, Dict, Optional, Tuple
 import logging
 import google.generativeai as genai
 from dotenv import load_dotenv
@@ -20,6 +23,59 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 
+# En-têtes et consignes invariants des prompts, factorisés hors des builders :
+# un préfixe stable octet pour octet maximise les hits du cache exact local et
+# du cache implicite de préfixe côté serveur Gemini (le KV-prefill des tokens
+# partagés est réutilisé entre appels). Le context caching explicite
+# (CachedContent) exige un préfixe de 32k tokens minimum — hors de portée de
+# ces prompts courts.
+ENRICH_INSTRUCTIONS = """Tu es un assistant qui enrichit des descriptions de préférences cinématographiques.
+
+Tâche : Enrichis la description fournie en ajoutant du contexte technique et des détails sur :
+- Les thèmes cinématographiques possibles
+- L'atmosphère recherchée
+- Le style narratif qui pourrait correspondre
+
+Règles :
+- Reste fidèle à l'intention originale
+- Ajoute 2-3 phrases maximum
+- Utilise un ton naturel
+- Ne change pas les préférences exprimées, ajoute seulement du contexte"""
+
+DISCOVERY_PLAN_HEADER = (
+    "Tu es un conseiller cinématographique expert qui crée des plans de découverte personnalisés."
+)
+
+DISCOVERY_PLAN_TASK = """TÂCHE : Crée un plan de découverte cinématographique personnalisé incluant :
+
+1. **Prochaines Étapes** : 3-4 films à découvrir en priorité (en dehors du top 3) pour enrichir le profil
+2. **Genres à Explorer** : Pourquoi découvrir les genres faiblement couverts et films recommandés par genre
+3. **Parcours Thématique** : Une progression logique (ex: du plus accessible au plus expérimental)
+
+Ton : Enthousiaste, pédagogique, personnalisé
+Format : Markdown avec sections claires
+Longueur : 300-400 mots maximum
+
+Plan de Découverte :"""
+
+CINEPHILE_PROFILE_HEADER = (
+    "Tu es un expert en profils cinématographiques qui rédige des synthèses personnalisées."
+)
+
+CINEPHILE_PROFILE_TASK = """TÂCHE : Rédige un profil cinéphile personnalisé (style executive summary) qui :
+
+1. Résume les goûts cinématographiques de la personne
+2. Identifie sa "signature" de cinéphile (qu'est-ce qui caractérise ses choix ?)
+3. Mentionne les réalisateurs ou mouvements qui pourraient l'intéresser
+4. Termine par une phrase accrocheuse qui capture son essence de spectateur
+
+Ton : Professionnel mais chaleureux, précis, valorisant
+Format : Un seul paragraphe fluide
+Longueur : 150-200 mots maximum
+
+Profil Cinéphile :"""
+
+
 def _get_api_key() -> Optional[str]:
     """Récupère la clé API depuis st.secrets (Cloud) ou .env (local)"""
     try:
@@ -49,11 +105,16 @@ class GenAIIntegration:
         api_key: Optional[str] = None,
         model_name: str = None,
         cache_enabled: bool = True,
-        max_cache_size: int = 100
+        max_cache_size: int = 100,
+        nlp_engine=None
     ):
         self.api_key = api_key or _get_api_key()
         self.model_name = model_name or _get_model_name()
 
+        # Moteur NLP partagé (évite un second chargement du modèle SBERT
+        # si un besoin d'embedding apparaît côté GenAI)
+        self.nlp_engine = nlp_engine
+
         if not self.api_key:
             raise ValueError(
                 "Cle API Gemini manquante. "
@@ -63,9 +124,10 @@ class GenAIIntegration:
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel(self.model_name)
 
-        # Utilise /tmp pour le cache (accessible sur Streamlit Cloud)
+        # /tmp par défaut (accessible sur Streamlit Cloud) ; GENAI_CACHE_DIR
+        # permet de pointer vers un disque persistant pour survivre aux restarts
         self.cache = CacheManager(
-            cache_dir="/tmp/.cache",
+            cache_dir=os.getenv("GENAI_CACHE_DIR", "/tmp/.cache"),
             max_size=max_cache_size,
             enabled=cache_enabled
         )
@@ -74,21 +136,184 @@ class GenAIIntegration:
 
         logger.info(f"GenAI initialisé - Modèle: {self.model_name}, Cache: {cache_enabled}")
 
-    def _call_gemini(self, prompt: str, use_cache: bool = True) -> str:
-        """Appelle l'API Gemini avec gestion du cache"""
+    # Seuil de similarité cosinus pour considérer deux prompts équivalents
+    SEMANTIC_CACHE_THRESHOLD = 0.95
+
+    def _check_semantic_cache(self, payload: str, namespace: str):
+        """
+        Recherche sémantique dans le cache pour les prompts reformulés
+
+        Seule la partie dynamique du prompt (payload) est embarquée : les
+        consignes invariantes dominaient l'embedding du prompt complet (et
+        MiniLM tronque à 128 tokens), au point que deux utilisateurs
+        différents dépassaient le seuil de similarité et partageaient leurs
+        réponses. Le namespace cloisonne en plus la recherche par template.
+
+        Returns:
+            (embedding, réponse cachée ou None) ; (None, None) sans moteur NLP
+        """
+        if self.nlp_engine is None:
+            return None, None
+
+        try:
+            embedding = self.nlp_engine.encode_text(payload)
+        except Exception as e:
+            logger.warning(f"Embedding du prompt impossible: {e}")
+            return None, None
+
+        return embedding, self.cache.get_semantic(
+            embedding, threshold=self.SEMANTIC_CACHE_THRESHOLD, namespace=namespace
+        )
+
+    def _call_gemini(
+        self,
+        prompt: str,
+        use_cache: bool = True,
+        generation_config: Optional[Dict] = None,
+        semantic_payload: Optional[str] = None,
+        namespace: Optional[str] = None
+    ) -> str:
+        """Appelle l'API Gemini avec gestion du cache (exact puis sémantique)"""
+        embedding = None
         if use_cache:
             cached_response = self.cache.get(prompt, model=self.model_name)
             if cached_response:
                 logger.info("Réponse trouvée dans le cache")
                 return cached_response
 
+            if semantic_payload is not None:
+                embedding, semantic_hit = self._check_semantic_cache(semantic_payload, namespace)
+                if semantic_hit:
+                    return semantic_hit
+
         try:
             logger.info(f"Appel API Gemini #{self.api_calls_count + 1}")
-            response = self.model.generate_content(prompt)
+            response = self.model.generate_content(prompt, generation_config=generation_config)
+            result = response.text
+
+            if use_cache:
+                self.cache.set(
+                    prompt, result, model=self.model_name,
+                    embedding=embedding, namespace=namespace
+                )
+
+            self.api_calls_count += 1
+            logger.info(f"Réponse générée ({len(result)} caractères)")
+            return result
+
+        except Exception as e:
+            logger.error(f"Erreur appel API Gemini: {e}")
+            return f"[Erreur de génération: {str(e)}]"
+
+    def _call_gemini_stream(
+        self,
+        prompt: str,
+        use_cache: bool = True,
+        semantic_payload: Optional[str] = None,
+        namespace: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Appelle l'API Gemini en streaming (latence perçue = premier token)
+
+        Sur un cache hit, la réponse complète est restituée en un seul chunk.
+        Sur un cache miss, les chunks sont émis au fil de l'eau et la réponse
+        assemblée est mise en cache à la fin du stream.
+        """
+        embedding = None
+        if use_cache:
+            cached_response = self.cache.get(prompt, model=self.model_name)
+            if cached_response:
+                logger.info("Réponse trouvée dans le cache")
+                yield cached_response
+                return
+
+            if semantic_payload is not None:
+                embedding, semantic_hit = self._check_semantic_cache(semantic_payload, namespace)
+                if semantic_hit:
+                    yield semantic_hit
+                    return
+
+        try:
+            logger.info(f"Appel API Gemini (stream) #{self.api_calls_count + 1}")
+            response = self.model.generate_content(prompt, stream=True)
+
+            chunks = []
+            for chunk in response:
+                if chunk.text:
+                    chunks.append(chunk.text)
+                    yield chunk.text
+
+            result = "".join(chunks)
+            if use_cache and result:
+                self.cache.set(
+                    prompt, result, model=self.model_name,
+                    embedding=embedding, namespace=namespace
+                )
+
+            self.api_calls_count += 1
+            logger.info(f"Réponse générée en streaming ({len(result)} caractères)")
+
+        except Exception as e:
+            logger.error(f"Erreur appel API Gemini: {e}")
+            yield f"[Erreur de génération: {str(e)}]"
+
+    def stream_discovery_plan(
+        self,
+        weak_genres: List[str],
+        recommendations: List[Dict],
+        user_profile_summary: str
+    ) -> Iterator[str]:
+        """Version streaming de generate_discovery_plan (pour st.write_stream)"""
+        prompt, payload = self._build_discovery_plan_prompt(weak_genres, recommendations, user_profile_summary)
+        yield from self._call_gemini_stream(
+            prompt, use_cache=True, semantic_payload=payload, namespace="plan"
+        )
+
+    def stream_cinephile_profile(
+        self,
+        recommendations: List[Dict],
+        genre_weights: Dict[str, float],
+        mood_weights: Dict[str, float],
+        coverage_score: float
+    ) -> Iterator[str]:
+        """Version streaming de generate_cinephile_profile (pour st.write_stream)"""
+        prompt, payload = self._build_cinephile_profile_prompt(
+            recommendations, genre_weights, mood_weights, coverage_score
+        )
+        yield from self._call_gemini_stream(
+            prompt, use_cache=True, semantic_payload=payload, namespace="profil"
+        )
+
+    async def _call_gemini_async(
+        self,
+        prompt: str,
+        use_cache: bool = True,
+        semantic_payload: Optional[str] = None,
+        namespace: Optional[str] = None
+    ) -> str:
+        """Version asynchrone de _call_gemini (permet asyncio.gather)"""
+        embedding = None
+        if use_cache:
+            cached_response = self.cache.get(prompt, model=self.model_name)
+            if cached_response:
+                logger.info("Réponse trouvée dans le cache")
+                return cached_response
+
+            if semantic_payload is not None:
+                embedding, semantic_hit = self._check_semantic_cache(semantic_payload, namespace)
+                if semantic_hit:
+                    return semantic_hit
+
+        try:
+            logger.info(f"Appel API Gemini (async) #{self.api_calls_count + 1}")
+            response = await self.model.generate_content_async(prompt)
             result = response.text
 
             if use_cache:
-                self.cache.set(prompt, result, model=self.model_name)
+                self.cache.set(
+                    prompt, result, model=self.model_name,
+                    embedding=embedding, namespace=namespace
+                )
 
             self.api_calls_count += 1
             logger.info(f"Réponse générée ({len(result)} caractères)")
@@ -108,37 +333,32 @@ class GenAIIntegration:
 
         logger.info(f"Texte court ({word_count} mots) - Enrichissement via GenAI")
 
-        prompt = f"""Tu es un assistant qui enrichit des descriptions de préférences cinématographiques.
+        # Consignes statiques en préfixe, données dynamiques en suffixe
+        prompt = f"""{ENRICH_INSTRUCTIONS}
 
 Description courte de l'utilisateur : "{text}"
 
-Tâche : Enrichis cette description en ajoutant du contexte technique et des détails sur :
-- Les thèmes cinématographiques possibles
-- L'atmosphère recherchée
-- Le style narratif qui pourrait correspondre
-
-Règles :
-- Reste fidèle à l'intention originale
-- Ajoute 2-3 phrases maximum
-- Utilise un ton naturel
-- Ne change pas les préférences exprimées, ajoute seulement du contexte
-
 Description enrichie :"""
 
-        enriched = self._call_gemini(prompt, use_cache=True)
+        enriched = self._call_gemini(
+            prompt, use_cache=True, semantic_payload=text, namespace="enrich"
+        )
         final_text = f"{text}\n\n{enriched.strip()}"
         logger.info(f"Texte enrichi ({len(final_text.split())} mots)")
         return final_text, True
 
-    def generate_discovery_plan(
+    def _build_discovery_plan_prompt(
         self,
         weak_genres: List[str],
         recommendations: List[Dict],
         user_profile_summary: str
-    ) -> str:
-        """Génère le Plan de Découverte (1 appel API)"""
-        logger.info("Génération du plan de découverte")
+    ) -> Tuple[str, str]:
+        """
+        Construit le prompt du Plan de Découverte
 
+        Returns:
+            (prompt complet, payload dynamique seul — pour le cache sémantique)
+        """
         reco_text = "\n".join([
             f"- {r['titre']} ({r['annee']}) de {r['realisateur']} - Score: {r['score_final']:.2f}"
             for r in recommendations[:3]
@@ -146,80 +366,263 @@ Description enrichie :"""
 
         weak_genres_text = ", ".join(weak_genres[:5]) if weak_genres else "Aucun"
 
-        prompt = f"""Tu es un conseiller cinématographique expert qui crée des plans de découverte personnalisés.
-
-PROFIL UTILISATEUR :
+        payload = f"""PROFIL UTILISATEUR :
 {user_profile_summary}
 
 FILMS RECOMMANDÉS (Top 3) :
 {reco_text}
 
 GENRES À EXPLORER (faible affinité actuelle) :
-{weak_genres_text}
+{weak_genres_text}"""
 
-TÂCHE : Crée un plan de découverte cinématographique personnalisé incluant :
+        prompt = f"""{DISCOVERY_PLAN_HEADER}
 
-1. **Prochaines Étapes** : 3-4 films à découvrir en priorité (en dehors du top 3) pour enrichir le profil
-2. **Genres à Explorer** : Pourquoi découvrir les genres faiblement couverts et films recommandés par genre
-3. **Parcours Thématique** : Une progression logique (ex: du plus accessible au plus expérimental)
+{payload}
 
-Ton : Enthousiaste, pédagogique, personnalisé
-Format : Markdown avec sections claires
-Longueur : 300-400 mots maximum
+{DISCOVERY_PLAN_TASK}"""
 
-Plan de Découverte :"""
+        return prompt, payload
 
-        plan = self._call_gemini(prompt, use_cache=True)
+    def generate_discovery_plan(
+        self,
+        weak_genres: List[str],
+        recommendations: List[Dict],
+        user_profile_summary: str
+    ) -> str:
+        """Génère le Plan de Découverte (1 appel API)"""
+        logger.info("Génération du plan de découverte")
+
+        prompt, payload = self._build_discovery_plan_prompt(weak_genres, recommendations, user_profile_summary)
+        plan = self._call_gemini(
+            prompt, use_cache=True, semantic_payload=payload, namespace="plan"
+        )
         logger.info("Plan de découverte généré")
         return plan.strip()
 
-    def generate_cinephile_profile(
+    async def agenerate_discovery_plan(
+        self,
+        weak_genres: List[str],
+        recommendations: List[Dict],
+        user_profile_summary: str
+    ) -> str:
+        """Version asynchrone de generate_discovery_plan"""
+        logger.info("Génération du plan de découverte (async)")
+
+        prompt, payload = self._build_discovery_plan_prompt(weak_genres, recommendations, user_profile_summary)
+        plan = await self._call_gemini_async(
+            prompt, use_cache=True, semantic_payload=payload, namespace="plan"
+        )
+        logger.info("Plan de découverte généré")
+        return plan.strip()
+
+    def _build_cinephile_profile_prompt(
         self,
         recommendations: List[Dict],
         genre_weights: Dict[str, float],
         mood_weights: Dict[str, float],
         coverage_score: float
-    ) -> str:
-        """Génère le Profil Cinéphile (1 appel API)"""
-        logger.info("Génération du profil cinéphile")
-
-        top_genres = [g for g, w in sorted(genre_weights.items(), key=lambda x: x[1], reverse=True) if w > 0.7][:3]
-        top_moods = [m for m, w in sorted(mood_weights.items(), key=lambda x: x[1], reverse=True) if w > 0.7][:3]
+    ) -> Tuple[str, str]:
+        """
+        Construit le prompt du Profil Cinéphile
+
+        Returns:
+            (prompt complet, payload dynamique seul — pour le cache sémantique)
+        """
+        # Tas de taille 3 plutôt qu'un tri complet des poids
+        top_genres = [g for g, w in heapq.nlargest(3, genre_weights.items(), key=lambda x: x[1]) if w > 0.7]
+        top_moods = [m for m, w in heapq.nlargest(3, mood_weights.items(), key=lambda x: x[1]) if w > 0.7]
         reco_titles = [f"{r['titre']} ({r['annee']})" for r in recommendations[:3]]
 
-        prompt = f"""Tu es un expert en profils cinématographiques qui rédige des synthèses personnalisées.
-
-DONNÉES DU PROFIL :
+        payload = f"""DONNÉES DU PROFIL :
 - Genres préférés : {', '.join(top_genres) if top_genres else 'Varié'}
 - Ambiances recherchées : {', '.join(top_moods) if top_moods else 'Varié'}
 - Films recommandés : {', '.join(reco_titles)}
-- Score d'affinité global : {coverage_score:.2f}/1.00
+- Score d'affinité global : {coverage_score:.2f}/1.00"""
 
-TÂCHE : Rédige un profil cinéphile personnalisé (style executive summary) qui :
+        prompt = f"""{CINEPHILE_PROFILE_HEADER}
 
-1. Résume les goûts cinématographiques de la personne
-2. Identifie sa "signature" de cinéphile (qu'est-ce qui caractérise ses choix ?)
-3. Mentionne les réalisateurs ou mouvements qui pourraient l'intéresser
-4. Termine par une phrase accrocheuse qui capture son essence de spectateur
+{payload}
 
-Ton : Professionnel mais chaleureux, précis, valorisant
-Format : Un seul paragraphe fluide
-Longueur : 150-200 mots maximum
+{CINEPHILE_PROFILE_TASK}"""
 
-Profil Cinéphile :"""
+        return prompt, payload
 
-        profile = self._call_gemini(prompt, use_cache=True)
+    def generate_cinephile_profile(
+        self,
+        recommendations: List[Dict],
+        genre_weights: Dict[str, float],
+        mood_weights: Dict[str, float],
+        coverage_score: float
+    ) -> str:
+        """Génère le Profil Cinéphile (1 appel API)"""
+        logger.info("Génération du profil cinéphile")
+
+        prompt, payload = self._build_cinephile_profile_prompt(
+            recommendations, genre_weights, mood_weights, coverage_score
+        )
+        profile = self._call_gemini(
+            prompt, use_cache=True, semantic_payload=payload, namespace="profil"
+        )
         logger.info("Profil cinéphile généré")
         return profile.strip()
 
-    def generate_film_justification(
+    async def agenerate_cinephile_profile(
+        self,
+        recommendations: List[Dict],
+        genre_weights: Dict[str, float],
+        mood_weights: Dict[str, float],
+        coverage_score: float
+    ) -> str:
+        """Version asynchrone de generate_cinephile_profile"""
+        logger.info("Génération du profil cinéphile (async)")
+
+        prompt, payload = self._build_cinephile_profile_prompt(
+            recommendations, genre_weights, mood_weights, coverage_score
+        )
+        profile = await self._call_gemini_async(
+            prompt, use_cache=True, semantic_payload=payload, namespace="profil"
+        )
+        logger.info("Profil cinéphile généré")
+        return profile.strip()
+
+    async def agenerate_all(
+        self,
+        weak_genres: List[str],
+        recommendations: List[Dict],
+        user_profile_summary: str,
+        genre_weights: Dict[str, float],
+        mood_weights: Dict[str, float],
+        coverage_score: float,
+        user_description: Optional[str] = None
+    ) -> Dict:
+        """
+        Lance en concurrence tous les appels Gemini indépendants
+
+        Le plan de découverte, le profil cinéphile et (si une description
+        utilisateur est fournie) les justifications par film ne dépendent pas
+        les uns des autres : asyncio.gather les dispatche ensemble et ramène
+        la latence totale à ~1 aller-retour réseau au lieu d'un par appel.
+        Les hits de cache sont résolus sans passer par le réseau.
+
+        Returns:
+            {'discovery_plan': ..., 'cinephile_profile': ..., 'justifications': [...]}
+        """
+        tasks = [
+            self.agenerate_discovery_plan(weak_genres, recommendations, user_profile_summary),
+            self.agenerate_cinephile_profile(
+                recommendations, genre_weights, mood_weights, coverage_score
+            )
+        ]
+
+        if user_description:
+            for film in recommendations[:3]:
+                prompt, payload = self._build_justification_prompt(
+                    film, user_description, film['composantes']
+                )
+                tasks.append(self._call_gemini_async(
+                    prompt, use_cache=True, semantic_payload=payload, namespace="justification"
+                ))
+
+        results = await asyncio.gather(*tasks)
+        self.cache.flush()
+
+        return {
+            'discovery_plan': results[0].strip(),
+            'cinephile_profile': results[1].strip(),
+            'justifications': [r.strip() for r in results[2:]]
+        }
+
+    def generate_profile_and_plan(
+        self,
+        weak_genres: List[str],
+        recommendations: List[Dict],
+        user_profile_summary: str,
+        genre_weights: Dict[str, float],
+        mood_weights: Dict[str, float],
+        coverage_score: float
+    ) -> Tuple[str, str]:
+        """
+        Génère le Plan de Découverte et le Profil Cinéphile en 1 seul appel API
+
+        Fusionne les deux prompts en une requête JSON structurée : un seul
+        aller-retour réseau au lieu de deux.
+
+        Returns:
+            (discovery_plan, cinephile_profile)
+        """
+        logger.info("Génération fusionnée plan + profil (1 appel API)")
+
+        plan_prompt, plan_payload = self._build_discovery_plan_prompt(
+            weak_genres, recommendations, user_profile_summary
+        )
+        profile_prompt, profile_payload = self._build_cinephile_profile_prompt(
+            recommendations, genre_weights, mood_weights, coverage_score
+        )
+
+        prompt = f"""Tu vas effectuer deux tâches indépendantes et renvoyer le résultat en JSON.
+
+TÂCHE 1 (clé "plan_decouverte") :
+{plan_prompt}
+
+TÂCHE 2 (clé "profil_cinephile") :
+{profile_prompt}
+
+Réponds UNIQUEMENT avec un objet JSON de la forme:
+{{"plan_decouverte": "...", "profil_cinephile": "..."}}"""
+
+        result = self._call_gemini(
+            prompt,
+            use_cache=True,
+            generation_config={"response_mime_type": "application/json"},
+            semantic_payload=f"{plan_payload}\n\n{profile_payload}",
+            namespace="plan+profil"
+        )
+        # Fin d'analyse : persister en une fois les entrées cachées pendant l'appel
+        self.cache.flush()
+
+        try:
+            parsed = json.loads(result)
+            if not isinstance(parsed, dict):
+                raise TypeError(f"objet JSON attendu, reçu {type(parsed).__name__}")
+            return parsed['plan_decouverte'].strip(), parsed['profil_cinephile'].strip()
+        except (json.JSONDecodeError, KeyError, AttributeError, TypeError) as e:
+            # JSON invalide : retomber sur les deux appels concurrents
+            logger.warning(f"Réponse JSON fusionnée invalide ({e}) - Repli sur 2 appels")
+
+            async def _fallback():
+                return await asyncio.gather(
+                    self.agenerate_discovery_plan(weak_genres, recommendations, user_profile_summary),
+                    self.agenerate_cinephile_profile(
+                        recommendations, genre_weights, mood_weights, coverage_score
+                    )
+                )
+
+            return tuple(asyncio.run(_fallback()))
+
+    def _build_justification_prompt(
         self,
         film: Dict,
         user_description: str,
         score_components: Dict[str, float]
-    ) -> str:
-        """Génère une justification pour une recommandation"""
-        prompt = f"""Explique en 2-3 phrases pourquoi le film "{film['titre']}" ({film['annee']}) 
+    ) -> Tuple[str, str]:
+        """
+        Construit le prompt de justification d'une recommandation
+
+        Returns:
+            (prompt complet, payload dynamique seul — pour le cache sémantique)
+        """
+        payload = f"""Film : "{film['titre']}" ({film['annee']})
+
+Préférences utilisateur : {user_description[:200]}...
+
+Description du film : {film['description'][:300]}...
+
+Scores :
+- Similarité sémantique : {score_components['sémantique']:.2f}
+- Affinité genre : {score_components['genre']:.2f}
+- Affinité mood : {score_components['mood']:.2f}"""
+
+        prompt = f"""Explique en 2-3 phrases pourquoi le film "{film['titre']}" ({film['annee']})
 correspond aux préférences de l'utilisateur.
 
 Préférences utilisateur : {user_description[:200]}...
@@ -233,7 +636,19 @@ Scores :
 
 Justification concise et personnalisée :"""
 
-        return self._call_gemini(prompt, use_cache=True).strip()
+        return prompt, payload
+
+    def generate_film_justification(
+        self,
+        film: Dict,
+        user_description: str,
+        score_components: Dict[str, float]
+    ) -> str:
+        """Génère une justification pour une recommandation"""
+        prompt, payload = self._build_justification_prompt(film, user_description, score_components)
+        return self._call_gemini(
+            prompt, use_cache=True, semantic_payload=payload, namespace="justification"
+        ).strip()
 
     def get_api_stats(self) -> Dict:
         """Retourne les statistiques d'utilisation"""
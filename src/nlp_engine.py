@@ -2,10 +2,14 @@
 Moteur NLP avec SBERT pour l'analyse semantique des preferences
 """
 
+import hashlib
+import os
 import pandas as pd
 import numpy as np
+import torch
+from collections import OrderedDict
+from pathlib import Path
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 from typing import List, Dict, Tuple, Optional
 import logging
 
@@ -14,87 +18,345 @@ logger = logging.getLogger(__name__)
 
 class NLPEngine:
     """Moteur d'analyse semantique SBERT"""
-    
-    def __init__(self, model_name: str = 'paraphrase-multilingual-MiniLM-L12-v2'):
-        """Initialise le modele SBERT"""
-        logger.info(f"Chargement du modèle SBERT: {model_name}")
-        
-        self.model = SentenceTransformer(model_name)
+
+    # Taille maximale du cache d'embeddings en mémoire (éviction LRU)
+    EMBEDDINGS_CACHE_SIZE = 512
+
+    # Au-delà de ce nombre de films, l'encodage à froid du référentiel est
+    # distribué sur plusieurs processus (contourne le GIL sur CPU)
+    MULTI_PROCESS_THRESHOLD = 500
+
+    # Presets de modèles : 'accurate' est le checkpoint historique (12
+    # couches), 'fast_cpu' un modèle multilingue distillé (6 couches,
+    # ~2x moins de FLOPs) pour les déploiements CPU contraints
+    MODEL_PRESETS = {
+        'accurate': 'paraphrase-multilingual-MiniLM-L12-v2',
+        'fast_cpu': 'distiluse-base-multilingual-cased-v1',
+    }
+
+    def __init__(
+        self,
+        model_name: str = 'paraphrase-multilingual-MiniLM-L12-v2',
+        quantize_int8: bool = False,
+        backend: str = 'torch',
+        num_threads: Optional[int] = None
+    ):
+        """
+        Initialise le modele SBERT
+
+        Args:
+            model_name: Nom du modele sentence-transformers, ou cle de
+                preset ('accurate', 'fast_cpu' - cf. MODEL_PRESETS)
+            quantize_int8: Quantification dynamique int8 des couches lineaires
+                (inference CPU ~2x plus rapide, perte negligeable sur le ranking
+                cosinus ; ignoree si un GPU est disponible ou si backend='onnx')
+            backend: Backend d'inference sentence-transformers ('torch' ou
+                'onnx' ; l'export ONNX accelere l'inference CPU, retombe sur
+                torch si onnxruntime n'est pas installe)
+            num_threads: Nombre de threads intra-op PyTorch (defaut:
+                os.cpu_count() ; a fixer explicitement dans les conteneurs ou
+                cpu_count() surestime le quota reel)
+        """
+        model_name = self.MODEL_PRESETS.get(model_name, model_name)
+        logger.info(f"Chargement du modèle SBERT: {model_name} (backend: {backend})")
+
+        # Saturer les coeurs disponibles pour les GEMM intra-op ; les defauts
+        # PyTorch laissent parfois des threads inutilises sur CPU multi-coeurs
+        if not torch.cuda.is_available():
+            torch.set_num_threads(num_threads or os.cpu_count() or 1)
+
+        if backend != 'torch':
+            try:
+                self.model = SentenceTransformer(model_name, backend=backend)
+            except Exception as e:
+                logger.warning(f"Backend {backend} indisponible ({e}), repli sur torch")
+                backend = 'torch'
+        if backend == 'torch':
+            self.model = SentenceTransformer(model_name)
+
         self.model_name = model_name
+        self.backend = backend
         self.referentiel = None
-        self.embeddings_cache = {}
-        
+        self.referentiel_path = None
+        self._ref_records = None
+        self._referentiel_embeddings = None
+        # LRU borné : sans limite, une session Streamlit longue accumulerait
+        # un embedding par texte rencontré (fuite mémoire progressive)
+        self.embeddings_cache = OrderedDict()
+
+        if backend == 'torch' and torch.cuda.is_available():
+            # Sur GPU : FP16 (bande passante d'activations divisée par 2) et
+            # fusion des kernels attention/MLP via torch.compile
+            self.model = self.model.to('cuda').half()
+            try:
+                self.model._first_module().auto_model = torch.compile(
+                    self.model._first_module().auto_model, mode='reduce-overhead'
+                )
+            except Exception as e:
+                logger.warning(f"torch.compile indisponible: {e}")
+            # Premier forward à vide : paie la compilation hors du chemin utilisateur
+            self.model.encode(["warmup", "warmup"], batch_size=2, show_progress_bar=False)
+            logger.info("Modèle SBERT sur GPU (FP16 + torch.compile)")
+
+        if quantize_int8 and backend == 'torch' and not torch.cuda.is_available():
+            backbone = self.model._first_module().auto_model
+            self.model._first_module().auto_model = torch.quantization.quantize_dynamic(
+                backbone, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            logger.info("Modèle SBERT quantifié en int8 dynamique (CPU)")
+
         logger.info("Modèle SBERT chargé avec succès")
     
     def load_referentiel(self, filepath: str = 'data/films_referentiel.csv') -> pd.DataFrame:
-        """Charge la base de films depuis le CSV"""
+        """Charge la base de films (CSV ou Parquet selon l'extension)"""
         logger.info(f"Chargement du référentiel: {filepath}")
-        
-        self.referentiel = pd.read_csv(filepath)
-        self.referentiel['texte_complet'] = self.referentiel.apply(
-            lambda row: self._build_film_text(row),
-            axis=1
+
+        self.referentiel_path = Path(filepath)
+        # Recharger le référentiel invalide les embeddings mémoïsés
+        self._referentiel_embeddings = None
+        if self.referentiel_path.suffix == '.parquet':
+            self.referentiel = pd.read_parquet(filepath)
+        else:
+            self.referentiel = pd.read_csv(filepath)
+        # Concaténation vectorisée (C) plutôt qu'un apply(axis=1) qui alloue
+        # une Series Python par film
+        df = self.referentiel
+        df['texte_complet'] = (
+            df['Film'] + ' (' + df['Annee'].astype(str) + '). '
+            'Réalisé par ' + df['Realisateur'] + '. '
+            'Genre: ' + df['Genre'] + '. '
+            'Description: ' + df['Description'] + ' '
+            'Mots-clés: ' + df['Keywords'] + '. '
+            'Ambiance: ' + df['Mood'] + '.'
         )
-        
+
+        # Lignes matérialisées en dicts une seule fois : l'accès par indice
+        # dans analyze_user_input évite un .iloc (et une Series) par match
+        self._ref_records = df.drop(columns=['texte_complet']).to_dict('records')
+
         logger.info(f"Referentiel chargé: {len(self.referentiel)} films")
         return self.referentiel
     
-    def _build_film_text(self, row: pd.Series) -> str:
-        """Construit le texte complet pour l'embedding"""
-        return (
-            f"{row['Film']} ({row['Annee']}). "
-            f"Réalisé par {row['Realisateur']}. "
-            f"Genre: {row['Genre']}. "
-            f"Description: {row['Description']} "
-            f"Mots-clés: {row['Keywords']}. "
-            f"Ambiance: {row['Mood']}."
-        )
-    
     def encode_text(self, text: str, cache_key: Optional[str] = None) -> np.ndarray:
-        """Encode un texte en vecteur d'embeddings"""
+        """
+        Encode un texte en vecteur d'embeddings
+
+        La mémoïsation est automatique : sans cache_key explicite, la clé
+        est dérivée du hash BLAKE2b du texte lui-même (adressage par
+        contenu, aucun risque de collision entre textes différents).
+        """
+        if cache_key is None:
+            cache_key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
         if cache_key and cache_key in self.embeddings_cache:
             logger.debug(f"Cache HIT pour: {cache_key}")
+            self.embeddings_cache.move_to_end(cache_key)
             return self.embeddings_cache[cache_key]
         
-        embedding = self.model.encode(text, convert_to_numpy=True, show_progress_bar=False)
+        # Normalisation L2 dans le forward pass : la similarité cosinus aval
+        # se réduit à un produit scalaire sans renormalisation ;
+        # inference_mode évite la comptabilité autograd du forward
+        with torch.inference_mode():
+            embedding = self.model.encode(
+                text,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+                normalize_embeddings=True
+            )
         
         if cache_key:
+            while len(self.embeddings_cache) >= self.EMBEDDINGS_CACHE_SIZE:
+                self.embeddings_cache.popitem(last=False)
             self.embeddings_cache[cache_key] = embedding
             logger.debug(f"Embedding mis en cache: {cache_key}")
         
         return embedding
     
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode une liste de textes en une matrice d'embeddings
+
+        Un seul forward pass pour tous les textes absents du cache (la
+        dimension batch du transformer est remplie au lieu d'un appel par
+        chaîne), puis les résultats sont redistribués dans le LRU.
+
+        Returns:
+            Matrice float32 de shape (len(texts), dim), lignes normalisées
+        """
+        keys = [
+            hashlib.blake2b(t.encode('utf-8'), digest_size=16).hexdigest()
+            for t in texts
+        ]
+
+        # Lignes du résultat accumulées localement : l'éviction LRU pendant
+        # l'insertion des miss peut retirer des clés du batch courant, le
+        # cache n'est donc pas une source fiable pour assembler la matrice
+        rows = {}
+        miss_positions = []
+        for i, key in enumerate(keys):
+            if key in rows:
+                continue
+            cached = self.embeddings_cache.get(key)
+            if cached is not None:
+                self.embeddings_cache.move_to_end(key)
+                rows[key] = cached
+            else:
+                miss_positions.append(i)
+                rows[key] = None
+
+        if miss_positions:
+            encoded = self._encode_batch([texts[i] for i in miss_positions])
+            for row, i in enumerate(miss_positions):
+                while len(self.embeddings_cache) >= self.EMBEDDINGS_CACHE_SIZE:
+                    self.embeddings_cache.popitem(last=False)
+                self.embeddings_cache[keys[i]] = encoded[row]
+                rows[keys[i]] = encoded[row]
+            logger.debug(f"Batch encode: {len(miss_positions)} miss / {len(texts)} textes")
+
+        return np.stack([rows[key] for key in keys])
+
+    def _embeddings_cache_path(self) -> Path:
+        """
+        Chemin du cache disque des embeddings du référentiel
+
+        Le hash couvre le corpus et le nom du modèle : toute modification du
+        CSV ou changement de modèle invalide automatiquement le cache.
+        """
+        corpus = "\n".join(self.referentiel['texte_complet']) + self.model_name
+        corpus_hash = hashlib.blake2b(corpus.encode('utf-8'), digest_size=16).hexdigest()
+        return self.referentiel_path.with_name(f"embeddings_{corpus_hash}.npy")
+
+    def _encode_batch(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Encode une liste de textes avec smart batching
+
+        Les textes sont triés par longueur avant l'encodage : chaque batch ne
+        contient que des textes de taille voisine, donc le padding se limite au
+        maximum du batch au lieu du maximum global. L'ordre d'origine est
+        restauré par permutation inverse.
+        """
+        order = np.argsort([len(t) for t in texts])
+        sorted_texts = [texts[i] for i in order]
+
+        with torch.inference_mode():
+            embeddings = self.model.encode(
+                sorted_texts,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+                batch_size=batch_size,
+                normalize_embeddings=True
+            )
+
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(len(order))
+        return embeddings[inverse]
+
     def encode_referentiel(self) -> np.ndarray:
-        """Encode tous les films du référentiel"""
+        """Encode tous les films du référentiel (avec cache disque .npy)"""
         if self.referentiel is None:
             raise ValueError("Le référentiel doit être chargé avant l'encodage")
-        
+
+        # Mémoïsation d'instance : chaque analyse réutilise la même matrice
+        # sans repasser par le hash du corpus ni par np.load
+        if self._referentiel_embeddings is not None:
+            return self._referentiel_embeddings
+
+        cache_path = self._embeddings_cache_path()
+        if cache_path.exists():
+            embeddings = np.load(cache_path, mmap_mode='r')
+            logger.info(f"Embeddings chargés depuis le cache disque - Shape: {embeddings.shape}")
+            self._referentiel_embeddings = embeddings
+            return embeddings
+
         logger.info(f"Encodage de {len(self.referentiel)} films...")
-        
-        embeddings = self.model.encode(
-            self.referentiel['texte_complet'].tolist(),
-            convert_to_numpy=True,
-            show_progress_bar=True,
-            batch_size=32
-        )
-        
+
+        texts = self.referentiel['texte_complet'].tolist()
+        if len(texts) > self.MULTI_PROCESS_THRESHOLD and not torch.cuda.is_available():
+            # Gros catalogue sur CPU : paralléliser l'encodage à froid sur
+            # plusieurs processus (le résultat est ensuite persisté en .npy,
+            # ce chemin ne s'exécute qu'au premier lancement)
+            try:
+                pool = self.model.start_multi_process_pool()
+                try:
+                    embeddings = self.model.encode_multi_process(
+                        texts, pool, batch_size=32, normalize_embeddings=True
+                    )
+                finally:
+                    self.model.stop_multi_process_pool(pool)
+            except Exception as e:
+                logger.warning(f"Encodage multi-process indisponible ({e}), repli mono-process")
+                embeddings = self._encode_batch(texts)
+        else:
+            embeddings = self._encode_batch(texts)
+
+        try:
+            np.save(cache_path, embeddings)
+            logger.info(f"Embeddings sauvegardés: {cache_path.name}")
+        except OSError as e:
+            logger.warning(f"Cache disque des embeddings indisponible: {e}")
+
         logger.info(f"Encodage terminé - Shape: {embeddings.shape}")
+        self._referentiel_embeddings = embeddings
         return embeddings
     
+    @staticmethod
+    def quantize_embeddings_int8(embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Quantifie une matrice d'embeddings en int8 symétrique par ligne
+
+        Le ranking cosinus ne dépend que de l'ordre des produits scalaires :
+        l'arrondi int8 divise par 4 les octets déplacés par la passe de
+        similarité, qui est limitée par la bande passante mémoire.
+
+        Returns:
+            (matrice int8, échelles par ligne pour la déquantification)
+        """
+        scales = 127.0 / np.maximum(np.abs(embeddings).max(axis=1, keepdims=True), 1e-12)
+        quantized = np.round(embeddings * scales).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def calculate_similarity_int8(
+        self,
+        user_embedding: np.ndarray,
+        quantized_embeddings: np.ndarray,
+        scales: np.ndarray
+    ) -> np.ndarray:
+        """Similarité cosinus sur embeddings int8 (accumulation entière)"""
+        query = np.asarray(user_embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        q_scale = 127.0 / max(float(np.abs(query).max()), 1e-12)
+        q_i8 = np.round(query * q_scale).astype(np.int8)
+
+        # Accumulation en int32 (l'int16 déborderait sur 384 dimensions),
+        # puis déquantification par les échelles ligne et requête
+        dots = quantized_embeddings.astype(np.int32) @ q_i8.astype(np.int32)
+        return dots.astype(np.float32) / (scales.ravel() * q_scale)
+
     def calculate_similarity(
         self, 
         user_embedding: np.ndarray, 
         referentiel_embeddings: np.ndarray
     ) -> np.ndarray:
-        """Calcule la similarité cosinus"""
-        if user_embedding.ndim == 1:
-            user_embedding = user_embedding.reshape(1, -1)
-        
-        similarities = cosine_similarity(user_embedding, referentiel_embeddings)[0]
-        
-        logger.info(f"Similarité - Min: {similarities.min():.3f}, "
-                   f"Max: {similarities.max():.3f}, Moyenne: {similarities.mean():.3f}")
-        
+        """Calcule la similarité cosinus (produit scalaire sur vecteurs normalisés)"""
+        if user_embedding.ndim > 1:
+            user_embedding = user_embedding.ravel()
+
+        # Les embeddings du référentiel sont normalisés à l'encodage :
+        # la similarité cosinus se réduit à un seul produit matrice-vecteur (BLAS)
+        user_norm = np.linalg.norm(user_embedding)
+        if user_norm > 0:
+            user_embedding = user_embedding / user_norm
+
+        similarities = referentiel_embeddings @ user_embedding
+
+        # Trois réductions sur le vecteur complet juste pour une ligne de log :
+        # ne les payer qu'en DEBUG
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Similarité - Min: %.3f, Max: %.3f, Moyenne: %.3f",
+                         similarities.min(), similarities.max(), similarities.mean())
+
         return similarities
     
     def get_top_matches(
@@ -103,10 +365,14 @@ class NLPEngine:
         top_n: int = 3
     ) -> List[Tuple[int, float]]:
         """Recupere les top N films les plus similaires"""
-        top_indices = np.argsort(similarities)[::-1][:top_n]
-        results = [(idx, float(similarities[idx])) for idx in top_indices]
-        
-        logger.info(f"Top {top_n} matches: {[f'{s:.3f}' for _, s in results]}")
+        # Partition O(N) puis tri des top_n seulement (au lieu d'un tri complet)
+        k = min(top_n, similarities.size)
+        top_indices = np.argpartition(similarities, -k)[-k:]
+        top_indices = top_indices[np.argsort(similarities[top_indices])[::-1]]
+        results = [(int(idx), float(similarities[idx])) for idx in top_indices]
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Top %d matches: %s", top_n, [f"{s:.3f}" for _, s in results])
         return results
     
     def analyze_user_input(
@@ -120,14 +386,17 @@ class NLPEngine:
         
         logger.info("Début de l'analyse sémantique...")
         
-        user_embedding = self.encode_text(user_text, cache_key="current_user_query")
+        # encode_text dérive la clé de cache du contenu du texte : deux
+        # analyses du même texte partagent l'embedding, un texte modifié
+        # ne récupère jamais un vecteur périmé
+        user_embedding = self.encode_text(user_text)
         referentiel_embeddings = self.encode_referentiel()
         similarities = self.calculate_similarity(user_embedding, referentiel_embeddings)
         top_matches = self.get_top_matches(similarities, top_n)
         
         recommendations = []
-        for idx, score in top_matches:
-            film = self.referentiel.iloc[idx]
+        for rang, (idx, score) in enumerate(top_matches, 1):
+            film = self._ref_records[idx]
             recommendations.append({
                 'film_id': film['FilmID'],
                 'titre': film['Film'],
@@ -140,7 +409,7 @@ class NLPEngine:
                 'mood': film['Mood'],
                 'block_id': film['BlockID'],
                 'score_similarite': float(score),
-                'rang': len(recommendations) + 1
+                'rang': rang
             })
         
         logger.info(f"Analyse terminée: {len(recommendations)} recommandations")
@@ -155,34 +424,48 @@ class NLPEngine:
         if self.referentiel is None:
             return {}
         
-        mask = similarities >= threshold
-        
+        mask = np.asarray(similarities) >= threshold
+
         if not mask.any():
             logger.warning(f"Aucun film au-dessus du seuil {threshold}")
             return {}
-        
-        genre_scores = {}
-        for genre in self.referentiel['Categorie'].unique():
-            genre_mask = self.referentiel['Categorie'] == genre
-            combined_mask = mask & genre_mask
-            
-            if combined_mask.any():
-                genre_scores[genre] = float(similarities[combined_mask].mean())
-        
-        sorted_genres = dict(sorted(genre_scores.items(), key=lambda x: x[1], reverse=True))
-        logger.info(f"Distribution: {len(sorted_genres)} genres")
-        
+
+        # Un seul groupby C au lieu d'un masque booléen par genre
+        scores = pd.Series(np.asarray(similarities)[mask])
+        genre_scores = scores.groupby(
+            self.referentiel.loc[mask, 'Categorie'].to_numpy()
+        ).mean()
+
+        sorted_genres = {
+            genre: float(score)
+            for genre, score in genre_scores.sort_values(ascending=False).items()
+        }
+        logger.debug("Distribution: %d genres", len(sorted_genres))
+
         return sorted_genres
     
     def get_coverage_stats(self, similarities: np.ndarray) -> Dict:
         """Statistiques de couverture du profil utilisateur"""
+        s = np.asarray(similarities)
+
+        # Les trois tranches d'affinité en un seul passage (digitize + bincount)
+        # au lieu de trois paires masque booléen + réduction
+        tranches = np.bincount(np.digitize(s, (0.5, 0.7)), minlength=3)
+        # Médiane par sélection O(N) plutôt que tri complet
+        mid = s.size // 2
+        if s.size % 2:
+            median = float(np.partition(s, mid)[mid])
+        else:
+            part = np.partition(s, [mid - 1, mid])
+            median = float((part[mid - 1] + part[mid]) / 2.0)
+
         return {
-            'score_moyen': float(similarities.mean()),
-            'score_median': float(np.median(similarities)),
-            'score_max': float(similarities.max()),
-            'score_min': float(similarities.min()),
-            'films_haute_affinite': int((similarities >= 0.7).sum()),
-            'films_affinite_moyenne': int(((similarities >= 0.5) & (similarities < 0.7)).sum()),
-            'films_faible_affinite': int((similarities < 0.5).sum()),
-            'total_films': len(similarities)
+            'score_moyen': float(s.mean()),
+            'score_median': median,
+            'score_max': float(s.max()),
+            'score_min': float(s.min()),
+            'films_haute_affinite': int(tranches[2]),
+            'films_affinite_moyenne': int(tranches[1]),
+            'films_faible_affinite': int(tranches[0]),
+            'total_films': s.size
         }
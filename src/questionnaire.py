@@ -3,41 +3,83 @@ Questionnaire pour collecter les preferences cinematographiques
 """
 
 import streamlit as st
-from typing import Dict, List
+import numpy as np
+from typing import Dict, List, Optional
+import heapq
 import json
+import os
+from functools import lru_cache
 from datetime import datetime
+
+# orjson serialise 2 a 10x plus vite que le json stdlib (encodage SIMD) ;
+# repli transparent sur json si le paquet n'est pas installe
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from pathlib import Path
 
 
+@lru_cache(maxsize=128)
+def _validate_cached(desc: str, genre_scores: tuple) -> tuple:
+    """
+    Verdict de validation memoise (fonction pure, sans effet Streamlit)
+
+    Cle = description nettoyee + scores de genres figes en tuple : les
+    reruns sans modification court-circuitent les verifications.
+
+    Returns:
+        (valide?, message, au moins une preference forte?)
+    """
+    if not desc:
+        return False, "Veuillez fournir une description de votre film ideal", False
+
+    if len(desc) < 20:
+        return (
+            False,
+            f"Description trop courte ({len(desc)} caracteres). Minimum 20 caracteres pour une analyse semantique de qualite.",
+            False
+        )
+
+    has_strong_pref = any(score >= 4 for score in genre_scores)
+    return True, "Questionnaire valide", has_strong_pref
+
+
 class QuestionnaireManager:
     """Gestionnaire du questionnaire"""
-    
+
+    # Ordre canonique fixe : permet de convertir les poids en arrays NumPy
+    # alignes entre le questionnaire et le scoring
+    GENRE_ORDER = (
+        "Science-Fiction",
+        "Drame",
+        "Fantasy",
+        "Animation",
+        "Thriller",
+        "Comedie",
+        "Horreur",
+        "Romance",
+        "Action",
+        "Biopic"
+    )
+
+    MOOD_ORDER = (
+        "Intellectuel/Reflexif",
+        "Emotionnel/Touchant",
+        "Intense/Tendu",
+        "Leger/Amusant",
+        "Sombre/Derangeant",
+        "Inspirant/Optimiste",
+        "Contemplatif/Melancolique",
+        "Energique/Dynamique"
+    )
+
     def __init__(self):
         """Initialise les categories de films"""
-        self.genres = [
-            "Science-Fiction",
-            "Drame",
-            "Fantasy",
-            "Animation",
-            "Thriller",
-            "Comedie",
-            "Horreur",
-            "Romance",
-            "Action",
-            "Biopic"
-        ]
-        
-        self.moods = [
-            "Intellectuel/Reflexif",
-            "Emotionnel/Touchant",
-            "Intense/Tendu",
-            "Leger/Amusant",
-            "Sombre/Derangeant",
-            "Inspirant/Optimiste",
-            "Contemplatif/Melancolique",
-            "Energique/Dynamique"
-        ]
-        
+        self.genres = list(self.GENRE_ORDER)
+
+        self.moods = list(self.MOOD_ORDER)
+
         self.periodes = [
             "Annees 1980 et avant",
             "Annees 1990",
@@ -45,130 +87,147 @@ class QuestionnaireManager:
             "Annees 2010",
             "Annees 2020"
         ]
-    
-    def render_questionnaire(self) -> Dict:
+
+        # Nombre de sessions par fichier de sauvegarde : compte une seule
+        # fois au premier save, puis incremente (evite de relire tout
+        # l'historique a chaque soumission)
+        self._session_counts = {}
+
+    def render_questionnaire(self) -> Optional[Dict]:
         """
         Affiche le questionnaire et collecte les reponses (EF1.1)
-        
+
         Returns:
-            Dictionnaire contenant toutes les reponses utilisateur
+            Dictionnaire contenant toutes les reponses utilisateur, ou None
+            tant que le formulaire n'a pas ete soumis
         """
         st.header("Questionnaire de Preferences Cinematographiques")
         st.markdown("---")
         
-        responses = {}
+        # st.form : l'etat des widgets est mis en lot cote navigateur et le
+        # script ne re-tourne qu'a la soumission, pas a chaque slider
+        with st.form("questionnaire", clear_on_submit=False):
+            responses = {}
+        
+            # Section 1: Description libre (EF1.1 - Question ouverte)
+            st.subheader("1. Decrivez votre film ideal")
+            st.markdown("""
+            *Decrivez en quelques phrases le type de film que vous recherchez : 
+            ambiance, themes, emotions recherchees, style narratif, atmosphere...*
+        
+            Conseil : Plus votre description est riche et detaillee, 
+            plus l'analyse semantique sera precise.
+            """)
+        
+            responses['description_libre'] = st.text_area(
+                "Votre description (minimum 20 caracteres)",
+                height=150,
+                placeholder="Exemple: Je cherche un film qui melange science-fiction et philosophie, "
+                           "avec des visuels impressionnants et une reflexion sur la nature de la realite. "
+                           "J'aime les films qui me font reflechir longtemps apres les avoir vus, "
+                           "avec une atmosphere contemplative et des twists narratifs surprenants...",
+                help="Cette description sera analysee semantiquement via SBERT",
+                key="desc_libre"
+            )
         
-        # Section 1: Description libre (EF1.1 - Question ouverte)
-        st.subheader("1. Decrivez votre film ideal")
-        st.markdown("""
-        *Decrivez en quelques phrases le type de film que vous recherchez : 
-        ambiance, themes, emotions recherchees, style narratif, atmosphere...*
+            st.markdown("---")
         
-        Conseil : Plus votre description est riche et detaillee, 
-        plus l'analyse semantique sera precise.
-        """)
+            # Section 2: Auto-declaration par genre (EF1.1 - Likert)
+            st.subheader("2. Evaluez votre interet pour chaque genre")
+            st.markdown("""
+            *Utilisez l'echelle de Likert pour indiquer votre niveau d'interet*
         
-        responses['description_libre'] = st.text_area(
-            "Votre description (minimum 20 caracteres)",
-            height=150,
-            placeholder="Exemple: Je cherche un film qui melange science-fiction et philosophie, "
-                       "avec des visuels impressionnants et une reflexion sur la nature de la realite. "
-                       "J'aime les films qui me font reflechir longtemps apres les avoir vus, "
-                       "avec une atmosphere contemplative et des twists narratifs surprenants...",
-            help="Cette description sera analysee semantiquement via SBERT",
-            key="desc_libre"
-        )
+            **Echelle** : 1 = Pas du tout interesse | 5 = Tres interesse
+            """)
         
-        st.markdown("---")
+            responses['preferences_genres'] = {}
+        
+            # Affichage en 2 colonnes pour meilleure UX
+            cols = st.columns(2)
+            for idx, genre in enumerate(self.genres):
+                with cols[idx % 2]:
+                    responses['preferences_genres'][genre] = st.slider(
+                        f"{genre}",
+                        min_value=1,
+                        max_value=5,
+                        value=3,
+                        key=f"genre_{genre}",
+                        help=f"Votre niveau d'interet pour le genre {genre}"
+                    )
         
-        # Section 2: Auto-declaration par genre (EF1.1 - Likert)
-        st.subheader("2. Evaluez votre interet pour chaque genre")
-        st.markdown("""
-        *Utilisez l'echelle de Likert pour indiquer votre niveau d'interet*
+            st.markdown("---")
         
-        **Echelle** : 1 = Pas du tout interesse | 5 = Tres interesse
-        """)
+            # Section 3: Mood/Ambiance (EF1.1 - Likert)
+            st.subheader("3. Quelle ambiance recherchez-vous ?")
+            st.markdown("""
+            *Evaluez l'intensite de l'ambiance ou du mood souhaite*
         
-        responses['preferences_genres'] = {}
+            **Echelle** : 1 = Pas du tout | 5 = Absolument
+            """)
         
-        # Affichage en 2 colonnes pour meilleure UX
-        cols = st.columns(2)
-        for idx, genre in enumerate(self.genres):
-            with cols[idx % 2]:
-                responses['preferences_genres'][genre] = st.slider(
-                    f"{genre}",
+            responses['preferences_moods'] = {}
+        
+            for mood in self.moods:
+                responses['preferences_moods'][mood] = st.slider(
+                    f"{mood}",
                     min_value=1,
                     max_value=5,
                     value=3,
-                    key=f"genre_{genre}",
-                    help=f"Votre niveau d'interet pour le genre {genre}"
+                    key=f"mood_{mood}",
+                    help=f"Intensite souhaitee pour l'ambiance: {mood}"
                 )
         
-        st.markdown("---")
-        
-        # Section 3: Mood/Ambiance (EF1.1 - Likert)
-        st.subheader("3. Quelle ambiance recherchez-vous ?")
-        st.markdown("""
-        *Evaluez l'intensite de l'ambiance ou du mood souhaite*
-        
-        **Echelle** : 1 = Pas du tout | 5 = Absolument
-        """)
+            st.markdown("---")
         
-        responses['preferences_moods'] = {}
+            # Section 4: Questions guidees
+            st.subheader("4. Questions complementaires")
         
-        for mood in self.moods:
-            responses['preferences_moods'][mood] = st.slider(
-                f"{mood}",
-                min_value=1,
-                max_value=5,
-                value=3,
-                key=f"mood_{mood}",
-                help=f"Intensite souhaitee pour l'ambiance: {mood}"
+            # Periode preferee
+            responses['periode_preferee'] = st.multiselect(
+                "Periode(s) de sortie preferee(s)",
+                self.periodes,
+                help="Vous pouvez selectionner plusieurs periodes",
+                key="periode"
             )
         
-        st.markdown("---")
-        
-        # Section 4: Questions guidees
-        st.subheader("4. Questions complementaires")
-        
-        # Periode preferee
-        responses['periode_preferee'] = st.multiselect(
-            "Periode(s) de sortie preferee(s)",
-            self.periodes,
-            help="Vous pouvez selectionner plusieurs periodes",
-            key="periode"
-        )
-        
-        # Realisateurs favoris
-        responses['realisateurs_favoris'] = st.text_input(
-            "Realisateurs favoris (separes par des virgules)",
-            placeholder="Ex: Christopher Nolan, Denis Villeneuve, Hayao Miyazaki",
-            help="Optionnel : cela nous aide a mieux cerner vos gouts cinematographiques",
-            key="realisateurs"
-        )
-        
-        # Films de reference
-        responses['films_references'] = st.text_area(
-            "Films que vous avez adores (un par ligne)",
-            height=100,
-            placeholder="Ex:\nInception\nBlade Runner 2049\nSpirited Away",
-            help="Optionnel : listez quelques films que vous considerez comme des references personnelles",
-            key="films_ref"
-        )
+            # Realisateurs favoris
+            responses['realisateurs_favoris'] = st.text_input(
+                "Realisateurs favoris (separes par des virgules)",
+                placeholder="Ex: Christopher Nolan, Denis Villeneuve, Hayao Miyazaki",
+                help="Optionnel : cela nous aide a mieux cerner vos gouts cinematographiques",
+                key="realisateurs"
+            )
         
-        # Elements a eviter
-        responses['elements_a_eviter'] = st.text_area(
-            "Y a-t-il des elements que vous souhaitez eviter ?",
-            height=80,
-            placeholder="Ex: violence graphique, fin triste, rythme lent, horreur gore...",
-            help="Optionnel : dites-nous ce que vous n'aimez pas ou preferez eviter",
-            key="eviter"
-        )
+            # Films de reference
+            responses['films_references'] = st.text_area(
+                "Films que vous avez adores (un par ligne)",
+                height=100,
+                placeholder="Ex:\nInception\nBlade Runner 2049\nSpirited Away",
+                help="Optionnel : listez quelques films que vous considerez comme des references personnelles",
+                key="films_ref"
+            )
         
-        # Metadonnees (EF1.2 - Structuration)
-        responses['timestamp'] = datetime.now().isoformat()
-        responses['version'] = "1.0"
+            # Elements a eviter
+            responses['elements_a_eviter'] = st.text_area(
+                "Y a-t-il des elements que vous souhaitez eviter ?",
+                height=80,
+                placeholder="Ex: violence graphique, fin triste, rythme lent, horreur gore...",
+                help="Optionnel : dites-nous ce que vous n'aimez pas ou preferez eviter",
+                key="eviter"
+            )
         
+            # Metadonnees (EF1.2 - Structuration)
+            responses['timestamp'] = datetime.now().isoformat()
+            responses['version'] = "1.0"
+
+            st.markdown("---")
+            submitted = st.form_submit_button(
+                "Analyser mes Preferences", type="primary", use_container_width=True
+            )
+
+        if not submitted:
+            return None
+
         return responses
     
     def validate_responses(self, responses: Dict) -> tuple[bool, str]:
@@ -181,67 +240,116 @@ class QuestionnaireManager:
         Returns:
             (bool, message): (validation reussie?, message d'erreur eventuel)
         """
-        # Verifier que la description libre est suffisante
         desc = responses.get('description_libre', '').strip()
-        
-        if not desc:
-            return False, "Veuillez fournir une description de votre film ideal"
-        
-        if len(desc) < 20:
-            return False, f"Description trop courte ({len(desc)} caracteres). Minimum 20 caracteres pour une analyse semantique de qualite."
-        
-        # Verification optionnelle : au moins une preference forte
-        genres_prefs = responses.get('preferences_genres', {})
-        has_strong_pref = any(score >= 4 for score in genres_prefs.values())
-        
-        if not has_strong_pref:
+        genre_scores = tuple(responses.get('preferences_genres', {}).values())
+
+        is_valid, message, has_strong_pref = _validate_cached(desc, genre_scores)
+
+        # L'effet d'affichage reste hors de la fonction memoisee
+        if is_valid and not has_strong_pref:
             # Warning mais pas bloquant
             st.info("Astuce : Indiquer au moins un genre avec un score de 4 ou 5 ameliore la precision des recommandations")
-        
-        return True, "Questionnaire valide"
+
+        return is_valid, message
     
-    def save_responses(self, responses: Dict, filepath: str = "data/user_responses.json") -> bool:
+    def save_responses(
+        self,
+        responses: Dict,
+        filepath: str = "data/user_responses.jsonl",
+        durable: bool = False
+    ) -> bool:
         """
         Sauvegarde les reponses utilisateur (EF1.2 - Structuration)
-        
+
+        Format JSON Lines (une session par ligne) : l'ajout d'une session est
+        un seul write() en append, jamais de troncature du fichier - un crash
+        pendant l'ecriture ne peut corrompre que la derniere ligne, pas
+        l'historique.
+
         Args:
             responses: Dictionnaire des reponses
             filepath: Chemin du fichier de sauvegarde
-            
+            durable: Forcer un fsync apres l'ecriture (garantie de durabilite
+                au prix d'une latence disque ; superflu pour des preferences)
+
         Returns:
             True si sauvegarde reussie, False sinon
         """
         try:
             filepath_obj = Path(filepath)
             filepath_obj.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Charger les reponses existantes
-            all_responses = []
-            if filepath_obj.exists():
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read().strip()
-                        if content:
-                            loaded = json.loads(content)
-                            all_responses = loaded if isinstance(loaded, list) else [loaded]
-                except json.JSONDecodeError:
-                    st.warning("Fichier de reponses corrompu, creation d'un nouveau fichier")
-                    all_responses = []
-            
-            # Ajouter les nouvelles reponses
-            all_responses.append(responses)
-            
-            # Sauvegarder
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(all_responses, f, ensure_ascii=False, indent=2)
-            
-            st.success(f"Reponses sauvegardees avec succes ({len(all_responses)} sessions totales)")
+            self._migrate_legacy_json(filepath_obj)
+
+            if orjson is not None:
+                line = orjson.dumps(responses) + b'\n'
+            else:
+                line = (json.dumps(responses, ensure_ascii=False) + '\n').encode('utf-8')
+
+            if filepath not in self._session_counts and filepath_obj.exists():
+                with open(filepath, 'rb') as f:
+                    self._session_counts[filepath] = sum(1 for _ in f)
+
+            with open(filepath, 'ab') as f:
+                f.write(line)
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            total = self._session_counts.get(filepath, 0) + 1
+            self._session_counts[filepath] = total
+
+            st.success(f"Reponses sauvegardees avec succes ({total} sessions totales)")
             return True
-            
+
         except Exception as e:
             st.error(f"Erreur lors de la sauvegarde: {e}")
             return False
-    
+
+    @staticmethod
+    def _migrate_legacy_json(filepath_obj: Path):
+        """
+        Migration unique de l'ancien format JSON (tableau) vers JSONL
+
+        L'ancien fichier user_responses.json est relu une derniere fois,
+        reecrit ligne par ligne dans le fichier JSONL, puis renomme en .bak.
+        """
+        legacy = filepath_obj.with_suffix('.json')
+        if not legacy.exists():
+            return
+
+        try:
+            with open(legacy, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+            sessions = json.loads(content) if content else []
+            if not isinstance(sessions, list):
+                sessions = [sessions]
+
+            with open(filepath_obj, 'a', encoding='utf-8') as f:
+                for session in sessions:
+                    f.write(json.dumps(session, ensure_ascii=False) + '\n')
+
+            legacy.rename(legacy.with_suffix('.json.bak'))
+        except (json.JSONDecodeError, OSError) as e:
+            st.warning(f"Migration de l'historique JSON impossible: {e}")
+
+    @staticmethod
+    def iter_responses(filepath: str = "data/user_responses.jsonl"):
+        """
+        Itere sur les sessions sauvegardees sans materialiser la liste
+
+        Yields:
+            Dictionnaire de reponses, une session a la fois
+        """
+        filepath_obj = Path(filepath)
+        if not filepath_obj.exists():
+            return
+        with open(filepath_obj, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
     def get_text_for_analysis(self, responses: Dict) -> str:
         """
         Compile toutes les entrees textuelles pour l'analyse semantique
@@ -252,45 +360,57 @@ class QuestionnaireManager:
         Returns:
             Texte consolide pour l'analyse SBERT
         """
-        text_parts = []
-        
-        # Section 1: Genres preferes (convertis en texte descriptif)
+        # Filtrer d'abord, trier ensuite : seuls les quelques items >= 4
+        # passent par le tri, au lieu du tri complet du dict
         genres_prefs = responses.get('preferences_genres', {})
-        top_genres = [genre for genre, score in sorted(genres_prefs.items(), key=lambda x: x[1], reverse=True) if score >= 4]
-        if top_genres:
-            text_parts.append(f"J'adore les films de {', '.join(top_genres)}.")
-        
-        # Section 2: Ambiances preferees (convertis en texte descriptif)
+        top_genres = [genre for genre, score in genres_prefs.items() if score >= 4]
+        top_genres.sort(key=genres_prefs.__getitem__, reverse=True)
+
         moods_prefs = responses.get('preferences_moods', {})
-        top_moods = [mood for mood, score in sorted(moods_prefs.items(), key=lambda x: x[1], reverse=True) if score >= 4]
-        if top_moods:
-            text_parts.append(f"Je recherche une ambiance {', '.join(top_moods)}.")
-        
-        # Section 3: Description principale (poids fort)
-        if responses.get('description_libre'):
-            text_parts.append(responses['description_libre'])
-        
-        # Section 4: Realisateurs favoris
-        if responses.get('realisateurs_favoris'):
-            text_parts.append(f"Realisateurs apprecies: {responses['realisateurs_favoris']}")
-        
-        # Section 5: Films de reference
-        if responses.get('films_references'):
-            films_list = responses['films_references'].strip()
-            if films_list:
-                text_parts.append(f"Films de reference: {films_list}")
-        
-        # Section 6: Periodes preferees
-        if responses.get('periode_preferee'):
-            periodes_str = ", ".join(responses['periode_preferee'])
-            text_parts.append(f"Periodes preferees: {periodes_str}")
-        
-        # Section 7: Elements a eviter (avec contexte negatif)
-        if responses.get('elements_a_eviter'):
-            text_parts.append(f"Je n'aime pas: {responses['elements_a_eviter']}")
-        
-        return " ".join(text_parts)
+        top_moods = [mood for mood, score in moods_prefs.items() if score >= 4]
+        top_moods.sort(key=moods_prefs.__getitem__, reverse=True)
+
+        # Un seul responses.get par champ, lie en local (LOAD_FAST) avant
+        # l'assemblage : plus de double lookup get + [] par section
+        description = responses.get('description_libre') or ''
+        realisateurs = responses.get('realisateurs_favoris') or ''
+        films_list = (responses.get('films_references') or '').strip()
+        periodes = responses.get('periode_preferee') or ()
+        a_eviter = responses.get('elements_a_eviter') or ''
+
+        # Sections assemblees en un seul tuple puis jointes : les champs
+        # vides sont filtres d'un bloc, sans branche append par section
+        parts = (
+            # Genres et ambiances convertis en texte descriptif
+            f"J'adore les films de {', '.join(top_genres)}." if top_genres else '',
+            f"Je recherche une ambiance {', '.join(top_moods)}." if top_moods else '',
+            # Description principale (poids fort)
+            description,
+            f"Realisateurs apprecies: {realisateurs}" if realisateurs else '',
+            f"Films de reference: {films_list}" if films_list else '',
+            f"Periodes preferees: {', '.join(periodes)}" if periodes else '',
+            # Elements a eviter (avec contexte negatif)
+            f"Je n'aime pas: {a_eviter}" if a_eviter else '',
+        )
+
+        return " ".join(p for p in parts if p)
     
+    @staticmethod
+    def get_top_preferences(weights: Dict[str, float], k: int = 3) -> List[str]:
+        """
+        Retourne les k libelles aux poids les plus forts
+
+        Utilise heapq.nlargest (O(N log k)) au lieu d'un tri complet.
+
+        Args:
+            weights: Dictionnaire {libelle: poids}
+            k: Nombre de libelles a retourner
+
+        Returns:
+            Liste des k libelles les mieux notes
+        """
+        return [label for label, _ in heapq.nlargest(k, weights.items(), key=lambda x: x[1])]
+
     def get_genre_weights(self, responses: Dict) -> Dict[str, float]:
         """
         Convertit les preferences Likert en poids normalises
@@ -317,6 +437,38 @@ class QuestionnaireManager:
             Dictionnaire {mood: poids normalise [0,1]}
         """
         prefs = responses.get('preferences_moods', {})
-        
+
         # Normaliser les scores de 1-5 a 0-1
         return {mood: (score / 5.0) for mood, score in prefs.items()}
+
+    def get_genre_weights_array(self, responses: Dict) -> np.ndarray:
+        """
+        Poids de genres en array NumPy dans l'ordre canonique GENRE_ORDER
+
+        Args:
+            responses: Dictionnaire des reponses
+
+        Returns:
+            Array float32 de shape (len(GENRE_ORDER),), poids dans [0,1]
+        """
+        prefs = responses.get('preferences_genres', {})
+        return np.asarray(
+            [prefs.get(genre, 0) / 5.0 for genre in self.GENRE_ORDER],
+            dtype=np.float32
+        )
+
+    def get_mood_weights_array(self, responses: Dict) -> np.ndarray:
+        """
+        Poids de moods en array NumPy dans l'ordre canonique MOOD_ORDER
+
+        Args:
+            responses: Dictionnaire des reponses
+
+        Returns:
+            Array float32 de shape (len(MOOD_ORDER),), poids dans [0,1]
+        """
+        prefs = responses.get('preferences_moods', {})
+        return np.asarray(
+            [prefs.get(mood, 0) / 5.0 for mood in self.MOOD_ORDER],
+            dtype=np.float32
+        )
@@ -10,13 +10,87 @@ Implemente la formule de score pondérée combinant:
 Equivalent AISCA: calcul du score de couverture des compétences
 """
 
+import hashlib
+import re
 import numpy as np
 import pandas as pd
+from functools import lru_cache
+from pathlib import Path
 from typing import List, Dict, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Séparateurs de tokens dans les colonnes Genre/Mood : un split() naïf
+# laissait les virgules collées aux tokens ("Science-Fiction," ne matchait
+# que par inclusion de sous-chaîne)
+_TOKEN_SPLIT_RE = re.compile(r"[,;/\s]+")
+
+
+@lru_cache(maxsize=4096)
+def _genre_score_cached(film_genres: str, frozen_weights: Tuple[Tuple[str, float], ...]) -> float:
+    """
+    Score de genre mémoïsé
+
+    Les mêmes chaînes de genres reviennent pour chaque film à chaque
+    session : la mémoïsation (clé = chaîne + poids figés en tuple)
+    court-circuite tokenisation et matching pour les entrées déjà vues.
+    """
+    # Parser les genres du film (séparateurs virgule/point-virgule/espace)
+    film_genre_list = [g for g in _TOKEN_SPLIT_RE.split(film_genres) if g]
+    user_genre_weights = dict(frozen_weights)
+
+    # Calculer le score moyen pour les genres du film
+    scores = []
+    for genre in film_genre_list:
+        # Sonde O(1) sur le nom canonique, puis repli sur la règle
+        # d'inclusion mutuelle pour les variantes partielles
+        weight = user_genre_weights.get(genre)
+        if weight is None:
+            for user_genre, candidate in user_genre_weights.items():
+                if genre in user_genre or user_genre in genre:
+                    weight = candidate
+                    break
+        if weight is not None:
+            scores.append(weight)
+
+    # Si aucun match, score par défaut de 0.5 (neutre)
+    if not scores:
+        return 0.5
+
+    # Moyenne en Python pur : plus rapide que np.mean sur <10 éléments
+    return sum(scores) / len(scores)
+
+
+@lru_cache(maxsize=4096)
+def _mood_score_cached(film_mood: str, frozen_weights: Tuple[Tuple[str, float], ...]) -> float:
+    """Score de mood mémoïsé (même principe que _genre_score_cached)"""
+    # Parser les moods du film (séparateurs virgule/slash/espace)
+    film_mood_list = [m.lower() for m in _TOKEN_SPLIT_RE.split(film_mood) if m]
+
+    # Dict pré-abaissé : sonde exacte O(1) avant la règle d'inclusion
+    lowered = {mood.lower(): weight for mood, weight in frozen_weights}
+
+    # Calculer le score moyen pour les moods du film
+    scores = []
+    for mood in film_mood_list:
+        weight = lowered.get(mood)
+        if weight is None:
+            for user_mood_lower, candidate in lowered.items():
+                # Match si le mood est dans la description ou vice-versa
+                if mood in user_mood_lower or any(word in mood for word in user_mood_lower.split('/')):
+                    weight = candidate
+                    break
+        if weight is not None:
+            scores.append(weight)
+
+    # Si aucun match, score par défaut de 0.5 (neutre)
+    if not scores:
+        return 0.5
+
+    # Moyenne en Python pur : plus rapide que np.mean sur <10 éléments
+    return sum(scores) / len(scores)
+
 
 class ScoringSystem:
     """
@@ -53,7 +127,12 @@ class ScoringSystem:
         self.alpha = alpha
         self.beta = beta
         self.gamma = gamma
-        
+        # Matrices d'appartenance (films x vocabulaire) précalculées : elles
+        # ne dépendent que du référentiel et du vocabulaire, pas des poids
+        self._membership_cache = {}
+        # Poids harmoniques 1/rang du score de couverture, alloués une fois
+        self._coverage_weights = 1.0 / np.arange(1, 11, dtype=np.float32)
+
         logger.info(f" ScoringSystem initialisé - α={alpha:.2f}, β={beta:.2f}, γ={gamma:.2f}")
     
     def calculate_genre_score(
@@ -71,24 +150,8 @@ class ScoringSystem:
         Returns:
             Score de genre normalisé [0, 1]
         """
-        # Parser les genres du film
-        film_genre_list = [g.strip() for g in film_genres.split()]
-        
-        # Calculer le score moyen pour les genres du film
-        scores = []
-        for genre in film_genre_list:
-            # Chercher le genre dans les préférences utilisateur
-            for user_genre, weight in user_genre_weights.items():
-                if genre in user_genre or user_genre in genre:
-                    scores.append(weight)
-                    break
-        
-        # Si aucun match, score par défaut de 0.5 (neutre)
-        if not scores:
-            return 0.5
-        
-        # Retourner la moyenne des scores
-        return float(np.mean(scores))
+        # Figer les poids en tuple hashable pour la clé de mémoïsation
+        return _genre_score_cached(film_genres, tuple(user_genre_weights.items()))
     
     def calculate_mood_score(
         self,
@@ -105,26 +168,8 @@ class ScoringSystem:
         Returns:
             Score de mood normalisé [0, 1]
         """
-        # Parser les moods du film
-        film_mood_list = [m.strip().lower() for m in film_mood.split()]
-        
-        # Calculer le score moyen pour les moods du film
-        scores = []
-        for mood in film_mood_list:
-            # Chercher des correspondances dans les préférences utilisateur
-            for user_mood, weight in user_mood_weights.items():
-                user_mood_lower = user_mood.lower()
-                # Match si le mood est dans la description ou vice-versa
-                if mood in user_mood_lower or any(word in mood for word in user_mood_lower.split('/')):
-                    scores.append(weight)
-                    break
-        
-        # Si aucun match, score par défaut de 0.5 (neutre)
-        if not scores:
-            return 0.5
-        
-        # Retourner la moyenne des scores
-        return float(np.mean(scores))
+        # Figer les poids en tuple hashable pour la clé de mémoïsation
+        return _mood_score_cached(film_mood, tuple(user_mood_weights.items()))
     
     def calculate_final_score(
         self,
@@ -151,12 +196,145 @@ class ScoringSystem:
             self.beta * genre_score +
             self.gamma * mood_score
         )
-        
-        # Assurer que le score reste dans [0, 1]
-        final_score = np.clip(final_score, 0.0, 1.0)
-        
-        return float(final_score)
+
+        # Assurer que le score reste dans [0, 1] : clamp en Python pur,
+        # np.clip sur un scalaire coûte un dispatch NumPy entier
+        # (la version vectorisée combine_scores garde np.clip(..., out=))
+        return 0.0 if final_score < 0.0 else (1.0 if final_score > 1.0 else final_score)
     
+    @staticmethod
+    def _genre_matches(film_genre: str, user_genre: str) -> bool:
+        """Même règle de correspondance que calculate_genre_score"""
+        return film_genre in user_genre or user_genre in film_genre
+
+    @staticmethod
+    def _mood_matches(film_mood: str, user_mood: str) -> bool:
+        """Même règle de correspondance que calculate_mood_score"""
+        user_mood_lower = user_mood.lower()
+        return film_mood in user_mood_lower or any(
+            word in film_mood for word in user_mood_lower.split('/')
+        )
+
+    def _membership_matrix(
+        self,
+        referentiel: pd.DataFrame,
+        column: str,
+        vocab: Tuple[str, ...],
+        matcher,
+        lowercase: bool = False
+    ) -> np.ndarray:
+        """
+        Matrice d'appartenance films x vocabulaire
+
+        M[i, j] compte les tokens du film i dont la première correspondance
+        dans le vocabulaire est l'entrée j (mêmes règles que les versions
+        scalaires). Construite une seule fois par (colonne, vocabulaire) puis
+        réutilisée : le scoring devient un produit matrice-vecteur.
+        """
+        cache_key = (column, vocab, len(referentiel))
+        matrix = self._membership_cache.get(cache_key)
+        if matrix is not None:
+            return matrix
+
+        col_values = referentiel[column].to_numpy()
+
+        # Cache disque adressé par contenu (colonne + vocabulaire) : les
+        # sessions suivantes rechargent la matrice en memory-map au lieu de
+        # repayer le matching par token ; même convention que le cache .npy
+        # des embeddings dans NLPEngine
+        digest = hashlib.blake2b(
+            "\x1f".join(col_values).encode('utf-8')
+            + repr(vocab).encode('utf-8')
+            + bytes([lowercase]),
+            digest_size=16
+        ).hexdigest()
+        disk_path = Path(".cache") / f"scoring_{column.lower()}_{digest}.npy"
+        if disk_path.exists():
+            matrix = np.load(disk_path, mmap_mode='r')
+            self._membership_cache[cache_key] = matrix
+            return matrix
+
+        matrix = np.zeros((len(referentiel), len(vocab)), dtype=np.float32)
+        for i, raw in enumerate(col_values):
+            tokens = [t for t in _TOKEN_SPLIT_RE.split(raw) if t]
+            if lowercase:
+                tokens = [t.lower() for t in tokens]
+            for token in tokens:
+                for j, label in enumerate(vocab):
+                    if matcher(token, label):
+                        matrix[i, j] += 1.0
+                        break
+
+        try:
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            np.save(disk_path, matrix)
+        except OSError as e:
+            logger.warning(f" Cache disque des matrices de scoring indisponible: {e}")
+
+        self._membership_cache[cache_key] = matrix
+        return matrix
+
+    def genre_scores_vector(
+        self,
+        referentiel: pd.DataFrame,
+        user_genre_weights: Dict[str, float]
+    ) -> np.ndarray:
+        """Scores de genre pour tout le référentiel en un produit BLAS"""
+        vocab = tuple(user_genre_weights)
+        matrix = self._membership_matrix(referentiel, 'Genre', vocab, self._genre_matches)
+        weights = np.fromiter(user_genre_weights.values(), dtype=np.float32, count=len(vocab))
+
+        counts = matrix.sum(axis=1)
+        totals = matrix @ weights
+        # Score par défaut 0.5 (neutre) pour les films sans correspondance
+        return np.where(counts > 0, totals / np.maximum(counts, 1.0), 0.5)
+
+    def mood_scores_vector(
+        self,
+        referentiel: pd.DataFrame,
+        user_mood_weights: Dict[str, float]
+    ) -> np.ndarray:
+        """Scores de mood pour tout le référentiel en un produit BLAS"""
+        vocab = tuple(user_mood_weights)
+        matrix = self._membership_matrix(
+            referentiel, 'Mood', vocab, self._mood_matches, lowercase=True
+        )
+        weights = np.fromiter(user_mood_weights.values(), dtype=np.float32, count=len(vocab))
+
+        counts = matrix.sum(axis=1)
+        totals = matrix @ weights
+        return np.where(counts > 0, totals / np.maximum(counts, 1.0), 0.5)
+
+    def combine_scores(
+        self,
+        semantic_scores: np.ndarray,
+        genre_scores: np.ndarray,
+        mood_scores: np.ndarray
+    ) -> np.ndarray:
+        """
+        Combine les trois composantes en scores finaux (version vectorisée)
+
+        Applique la formule pondérée sur des arrays NumPy entiers au lieu
+        d'un appel Python par film.
+
+        Args:
+            semantic_scores: Similarités sémantiques, shape (N,)
+            genre_scores: Scores de genre, shape (N,)
+            mood_scores: Scores de mood, shape (N,)
+
+        Returns:
+            Scores finaux normalisés [0, 1], shape (N,)
+        """
+        # float32 : les scores ne servent qu'au classement, la demi-précision
+        # de bande passante double le débit des kernels mémoire-bound
+        final_scores = (
+            self.alpha * np.asarray(semantic_scores, dtype=np.float32) +
+            self.beta * np.asarray(genre_scores, dtype=np.float32) +
+            self.gamma * np.asarray(mood_scores, dtype=np.float32)
+        )
+        np.clip(final_scores, 0.0, 1.0, out=final_scores)
+        return final_scores
+
     def rank_films(
         self,
         recommendations: List[Dict],
@@ -179,48 +357,50 @@ class ScoringSystem:
             Liste des recommandations enrichies et reclassées
         """
         logger.info(" Calcul des scores finaux pondérés...")
-        
+
+        if not recommendations:
+            return []
+
+        # Scores de genre/mood calculés sur tout le référentiel en deux
+        # produits matrice-vecteur, puis indexés par la position des films
+        genre_vector = self.genre_scores_vector(referentiel, user_genre_weights)
+        mood_vector = self.mood_scores_vector(referentiel, user_mood_weights)
+        positions = {fid: i for i, fid in enumerate(referentiel['FilmID'].to_numpy())}
+        indices = np.array([positions[rec['film_id']] for rec in recommendations], dtype=np.intp)
+
+        semantic_sims = np.array([rec['score_similarite'] for rec in recommendations], dtype=np.float32)
+        genre_scores = genre_vector[indices]
+        mood_scores = mood_vector[indices]
+
+        final_scores = self.combine_scores(semantic_sims, genre_scores, mood_scores)
+
+        # Ordre final par argsort sur l'array, puis une seule passe de
+        # matérialisation : un dict littéral par film (rang compris) au lieu
+        # du triptyque copy/update/re-tri qui allouait ~5 dicts par entrée
+        order = np.argsort(-final_scores)
+        # Composantes aussi exposées en matrice float32 (une ligne par film,
+        # colonnes sémantique/genre/mood) : les visualisations empilent ces
+        # lignes sans repasser par les clés Unicode du dict composantes
+        comp_matrix = np.stack(
+            [semantic_sims, genre_scores, mood_scores], axis=1
+        ).astype(np.float32)
         enriched_recs = []
-        
-        for rec in recommendations:
-            # Récupérer les données du film
-            film_genres = rec['genre']
-            film_mood = rec['mood']
-            semantic_sim = rec['score_similarite']
-            
-            # Calculer les composantes du score
-            genre_score = self.calculate_genre_score(film_genres, user_genre_weights)
-            mood_score = self.calculate_mood_score(film_mood, user_mood_weights)
-            
-            # Calculer le score final
-            final_score = self.calculate_final_score(
-                semantic_similarity=semantic_sim,
-                genre_score=genre_score,
-                mood_score=mood_score
-            )
-            
-            # Enrichir la recommandation
-            enriched_rec = rec.copy()
-            enriched_rec.update({
-                'score_genre': genre_score,
-                'score_mood': mood_score,
-                'score_final': final_score,
+        for rang, i in enumerate(order, 1):
+            rec = recommendations[i]
+            enriched_recs.append({
+                **rec,
+                'score_genre': float(genre_scores[i]),
+                'score_mood': float(mood_scores[i]),
+                'score_final': float(final_scores[i]),
                 'composantes': {
-                    'sémantique': semantic_sim,
-                    'genre': genre_score,
-                    'mood': mood_score
-                }
+                    'sémantique': rec['score_similarite'],
+                    'genre': float(genre_scores[i]),
+                    'mood': float(mood_scores[i])
+                },
+                '_comp_array': comp_matrix[i],
+                'rang': rang
             })
-            
-            enriched_recs.append(enriched_rec)
-        
-        # Reclasser par score final décroissant
-        enriched_recs.sort(key=lambda x: x['score_final'], reverse=True)
-        
-        # Mettre à jour les rangs
-        for idx, rec in enumerate(enriched_recs):
-            rec['rang'] = idx + 1
-        
+
         logger.info(f" Scores calculés et films reclassés")
         top_scores = [f"{r['score_final']:.3f}" for r in enriched_recs[:3]]
         logger.info(f" Top 3 scores finaux: {top_scores}")
@@ -267,25 +447,20 @@ class ScoringSystem:
         """
         # Prendre les top 10 films pour le calcul de couverture
         top_10_indices = np.argsort(semantic_similarities)[::-1][:10]
-        
-        scores = []
-        for idx in top_10_indices:
-            film = referentiel.iloc[idx]
-            genre_score = self.calculate_genre_score(film['Genre'], user_genre_weights)
-            mood_score = self.calculate_mood_score(film['Mood'], user_mood_weights)
-            
-            final_score = self.calculate_final_score(
-                semantic_similarity=semantic_similarities[idx],
-                genre_score=genre_score,
-                mood_score=mood_score
-            )
-            scores.append(final_score)
-        
-        # Moyenne pondérée (plus de poids aux premiers)
-        weights = np.array([1.0 / (i + 1) for i in range(len(scores))])
-        weights = weights / weights.sum()
-        
-        coverage_score = float(np.average(scores, weights=weights))
+
+        # Scores de genre/mood via les vecteurs précalculés sur tout le
+        # référentiel (mêmes matrices que rank_films), indexés par le top 10 :
+        # plus aucun .iloc ni Series pandas par film
+        genre_scores = self.genre_scores_vector(referentiel, user_genre_weights)[top_10_indices]
+        mood_scores = self.mood_scores_vector(referentiel, user_mood_weights)[top_10_indices]
+        final_scores = self.combine_scores(
+            semantic_similarities[top_10_indices], genre_scores, mood_scores
+        )
+
+        # Moyenne pondérée (plus de poids aux premiers), poids harmoniques
+        # préalloués à l'init et renormalisés sur la taille effective
+        weights = self._coverage_weights[:len(final_scores)]
+        coverage_score = float(final_scores @ (weights / weights.sum()))
         
         logger.info(f" Score de couverture global: {coverage_score:.3f}")
         
@@ -310,23 +485,19 @@ class ScoringSystem:
         Returns:
             Liste des genres à explorer
         """
-        genre_avg_scores = {}
-        
-        for genre in referentiel['Categorie'].unique():
-            genre_mask = referentiel['Categorie'] == genre
-            genre_sims = semantic_similarities[genre_mask]
-            
-            if len(genre_sims) > 0:
-                genre_avg_scores[genre] = float(genre_sims.mean())
-        
-        # Identifier les genres sous le seuil
-        weak_genres = [
-            genre for genre, score in genre_avg_scores.items()
-            if score < threshold
-        ]
-        
-        # Trier par score croissant (les plus faibles en premier)
-        weak_genres.sort(key=lambda g: genre_avg_scores[g])
+        # Encodage entier des catégories puis moyennes par np.bincount :
+        # une seule passe sur le vecteur de similarités au lieu d'un masque
+        # booléen complet par genre
+        codes, categories = pd.factorize(referentiel['Categorie'])
+        sums = np.bincount(codes, weights=semantic_similarities, minlength=len(categories))
+        counts = np.bincount(codes, minlength=len(categories))
+        means = sums / np.maximum(counts, 1)
+
+        # Genres sous le seuil, triés par score croissant (les plus faibles
+        # en premier)
+        weak_idx = np.where(means < threshold)[0]
+        weak_idx = weak_idx[np.argsort(means[weak_idx])]
+        weak_genres = [categories[i] for i in weak_idx]
         
         logger.info(f"📉 Genres faiblement couverts: {weak_genres}")
         
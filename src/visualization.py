@@ -10,26 +10,206 @@ Visualisations:
 """
 
 import streamlit as st
+from html import escape as _escape
 import plotly.graph_objects as go
-import plotly.express as px
-from typing import Dict, List
-import pandas as pd
+import plotly.io as pio
+from plotly.subplots import make_subplots
+from types import MappingProxyType
+from typing import Dict, List, Tuple
 import numpy as np
 
+# Sérialisation JSON des figures via orjson (encodeur C, 3-5x plus rapide
+# que le chemin pur Python) ; sans le paquet, Plotly garde son encodeur
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = 'orjson'
+except (ImportError, ValueError):
+    pass
+
+
+@st.cache_resource(show_spinner=False)
+def _cached_dashboard(
+    genre_items: Tuple[Tuple[str, float], ...],
+    mood_items: Tuple[Tuple[str, float], ...],
+    rec_rows: Tuple[Tuple[str, float, float, float], ...],
+    score_items: Tuple[Tuple[str, float], ...]
+) -> go.Figure:
+    """
+    Figure du tableau de bord mémoïsée sur ses entrées (tuples hashables)
+
+    La construction + sérialisation d'une figure à 7 traces coûte plus que
+    le rendu ; tant que les résultats d'analyse ne changent pas, chaque
+    rerun de l'onglet réutilise le même objet Figure. Pas de variante
+    WebGL : Plotly n'a pas d'équivalent gl pour Scatterpolar ni Bar.
+    """
+    fig = make_subplots(
+        rows=2, cols=2,
+        specs=[[{'type': 'polar'}, {'type': 'polar'}],
+               [{'type': 'xy'}, {'type': 'xy'}]],
+        subplot_titles=(
+            "Préférences par Genre", "Préférences d'Ambiance",
+            "Scores des Recommandations", "Affinité par Genre"
+        ),
+        vertical_spacing=0.14
+    )
+
+    # Radars genre / mood (fermés sur le premier point)
+    genres = [g for g, _ in genre_items]
+    genre_values = [v for _, v in genre_items]
+    fig.add_trace(go.Scatterpolar(
+        r=genre_values + [genre_values[0]],
+        theta=genres + [genres[0]],
+        fill='toself',
+        fillcolor='rgba(255, 107, 107, 0.3)',
+        line=dict(color='rgb(255, 107, 107)', width=2),
+        showlegend=False
+    ), row=1, col=1)
+
+    moods = [m for m, _ in mood_items]
+    mood_values = [v for _, v in mood_items]
+    fig.add_trace(go.Scatterpolar(
+        r=mood_values + [mood_values[0]],
+        theta=moods + [moods[0]],
+        fill='toself',
+        fillcolor='rgba(78, 205, 196, 0.3)',
+        line=dict(color='rgb(78, 205, 196)', width=2),
+        showlegend=False
+    ), row=1, col=2)
+
+    # Barres empilées des composantes du score
+    films = [row[0] for row in rec_rows]
+    composantes = [
+        ('Sémantique (50%)', 1, 0.5, 'rgb(255, 107, 107)'),
+        ('Genre (30%)', 2, 0.3, 'rgb(78, 205, 196)'),
+        ('Mood (20%)', 3, 0.2, 'rgb(255, 230, 109)')
+    ]
+    for name, idx, weight, color in composantes:
+        fig.add_trace(go.Bar(
+            name=name,
+            x=films,
+            y=[row[idx] * weight for row in rec_rows],
+            marker_color=color
+        ), row=2, col=1)
+
+    # Distribution de l'affinité par genre
+    if score_items:
+        sorted_scores = sorted(score_items, key=lambda x: x[1], reverse=True)
+        fig.add_trace(go.Bar(
+            x=[g for g, _ in sorted_scores],
+            y=[s for _, s in sorted_scores],
+            marker=dict(
+                color=[s for _, s in sorted_scores],
+                colorscale='RdYlGn',
+                cmin=0, cmax=1
+            ),
+            showlegend=False
+        ), row=2, col=2)
+
+    fig.update_polars(radialaxis=dict(
+        visible=True, range=[0, 1], tickmode='linear', tick0=0, dtick=0.2
+    ))
+    fig.update_layout(
+        barmode='stack',
+        height=900,
+        legend=dict(orientation="h", yanchor="bottom", y=-0.08, xanchor="center", x=0.5),
+        yaxis=dict(title='Score Pondéré', range=[0, 1]),
+        yaxis2=dict(range=[0, 1]),
+        xaxis2=dict(tickangle=-45)
+    )
+
+    return fig
+
+
+# Gabarit de figure radar construit une fois au chargement du module :
+# chaque rendu en copie le layout (axe polaire, hauteur) au lieu de
+# reconstruire le dict de ~20 clés à chaque appel
+_RADAR_TEMPLATE = go.Figure()
+_RADAR_TEMPLATE.update_layout(
+    polar=dict(
+        radialaxis=dict(
+            visible=True,
+            range=[0, 1],
+            tickmode='linear',
+            tick0=0,
+            dtick=0.2
+        )
+    ),
+    showlegend=False,
+    height=500
+)
+
+
+@st.cache_data(show_spinner=False)
+def _format_coverage(stats_items: Tuple[Tuple[str, float], ...]) -> Dict[str, str]:
+    """Chaînes des métriques de couverture, mémoïsées sur les stats"""
+    stats = dict(stats_items)
+    return {
+        'score_moyen': f"{stats['score_moyen']:.2%}",
+        'haute': str(stats['films_haute_affinite']),
+        'moyenne': str(stats['films_affinite_moyenne']),
+        'faible': str(stats['films_faible_affinite'])
+    }
+
+
+@st.cache_data(show_spinner=False)
+def _format_api_usage(calls: int, entries: int, max_size: int, usage_percent: float) -> Dict[str, str]:
+    """Chaînes des métriques d'usage API, mémoïsées sur les compteurs"""
+    return {
+        'calls': str(calls),
+        'cache': f"{entries}/{max_size}",
+        'usage': f"{usage_percent:.1f}%"
+    }
+
 
 class VisualizationManager:
     """Gestionnaire des visualisations pour l'application"""
-    
-    def __init__(self):
-        """Initialise le gestionnaire de visualisation"""
-        self.color_scheme = {
-            'primary': '#FF6B6B',
-            'secondary': '#4ECDC4',
-            'accent': '#FFE66D',
-            'dark': '#2C3E50',
-            'light': '#ECF0F1'
-        }
-    
+
+    # Palette partagée au niveau classe (jamais mutée) : aucune allocation
+    # par instanciation, et MappingProxyType fige le dict contre toute
+    # modification accidentelle
+    color_scheme = MappingProxyType({
+        'primary': '#FF6B6B',
+        'secondary': '#4ECDC4',
+        'accent': '#FFE66D',
+        'dark': '#2C3E50',
+        'light': '#ECF0F1'
+    })
+
+    def _plot_radar(
+        self,
+        weights: Dict[str, float],
+        fill_rgba: str,
+        line_rgb: str,
+        name: str,
+        title: str
+    ):
+        """
+        Rendu radar commun aux préférences de genre et de mood
+
+        Copie le gabarit de layout précalculé (_RADAR_TEMPLATE) et n'y
+        ajoute que la trace et le titre spécifiques à l'appel.
+        """
+        # Valeurs en array NumPy ferme par concatenation (Plotly serialise
+        # les buffers NumPy sans encodage JSON element par element)
+        values = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+        values_closed = np.concatenate([values, values[:1]])
+        labels_closed = list(weights) + [next(iter(weights))]
+
+        fig = go.Figure(_RADAR_TEMPLATE)
+
+        fig.add_trace(go.Scatterpolar(
+            r=values_closed,
+            theta=labels_closed,
+            fill='toself',
+            fillcolor=fill_rgba,
+            line=dict(color=line_rgb, width=2),
+            name=name
+        ))
+
+        fig.update_layout(title=dict(text=title, x=0.5, xanchor='center'))
+
+        st.plotly_chart(fig, use_container_width=True)
+
     def plot_genre_radar(
         self,
         genre_weights: Dict[str, float],
@@ -37,46 +217,19 @@ class VisualizationManager:
     ):
         """
         Crée un graphique radar des préférences de genre
-        
+
         Args:
             genre_weights: Dictionnaire {genre: poids [0,1]}
             title: Titre du graphique
         """
-        genres = list(genre_weights.keys())
-        values = list(genre_weights.values())
-        
-        # Fermer le radar
-        genres_closed = genres + [genres[0]]
-        values_closed = values + [values[0]]
-        
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatterpolar(
-            r=values_closed,
-            theta=genres_closed,
-            fill='toself',
-            fillcolor='rgba(255, 107, 107, 0.3)',
-            line=dict(color='rgb(255, 107, 107)', width=2),
-            name='Préférences'
-        ))
-        
-        fig.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, 1],
-                    tickmode='linear',
-                    tick0=0,
-                    dtick=0.2
-                )
-            ),
-            showlegend=False,
-            title=dict(text=title, x=0.5, xanchor='center'),
-            height=500
+        self._plot_radar(
+            genre_weights,
+            fill_rgba='rgba(255, 107, 107, 0.3)',
+            line_rgb='rgb(255, 107, 107)',
+            name='Préférences',
+            title=title
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
-    
+
     def plot_mood_radar(
         self,
         mood_weights: Dict[str, float],
@@ -84,46 +237,19 @@ class VisualizationManager:
     ):
         """
         Crée un graphique radar des préférences de mood
-        
+
         Args:
             mood_weights: Dictionnaire {mood: poids [0,1]}
             title: Titre du graphique
         """
-        moods = list(mood_weights.keys())
-        values = list(mood_weights.values())
-        
-        # Fermer le radar
-        moods_closed = moods + [moods[0]]
-        values_closed = values + [values[0]]
-        
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatterpolar(
-            r=values_closed,
-            theta=moods_closed,
-            fill='toself',
-            fillcolor='rgba(78, 205, 196, 0.3)',
-            line=dict(color='rgb(78, 205, 196)', width=2),
-            name='Ambiances'
-        ))
-        
-        fig.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, 1],
-                    tickmode='linear',
-                    tick0=0,
-                    dtick=0.2
-                )
-            ),
-            showlegend=False,
-            title=dict(text=title, x=0.5, xanchor='center'),
-            height=500
+        self._plot_radar(
+            mood_weights,
+            fill_rgba='rgba(78, 205, 196, 0.3)',
+            line_rgb='rgb(78, 205, 196)',
+            name='Ambiances',
+            title=title
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
-    
+
     def plot_recommendation_scores(
         self,
         recommendations: List[Dict],
@@ -136,38 +262,43 @@ class VisualizationManager:
             recommendations: Liste des recommandations
             title: Titre du graphique
         """
-        df = pd.DataFrame([
-            {
-                'Film': f"{r['titre']} ({r['annee']})",
-                'Score Final': r['score_final'],
-                'Sémantique': r['composantes']['sémantique'],
-                'Genre': r['composantes']['genre'],
-                'Mood': r['composantes']['mood']
-            }
-            for r in recommendations[:3]
-        ])
-        
+        # Construction colonnaire NumPy : aucun DataFrame intermédiaire,
+        # les composantes sont pondérées en un seul produit élément par élément
+        recs = recommendations[:3]
+        films = [f"{r['titre']} ({r['annee']})" for r in recs]
+        # Lignes _comp_array précalculées par rank_films quand disponibles ;
+        # repli sur les clés du dict composantes pour les anciens formats
+        if recs and '_comp_array' in recs[0]:
+            composantes = np.stack([r['_comp_array'] for r in recs])
+        else:
+            composantes = np.fromiter(
+                (r['composantes'][k] for r in recs for k in ('sémantique', 'genre', 'mood')),
+                dtype=np.float32,
+                count=3 * len(recs)
+            ).reshape(-1, 3)
+        weighted = composantes * np.array([0.5, 0.3, 0.2], dtype=np.float32)
+
         # Graphique empilé
         fig = go.Figure()
-        
+
         fig.add_trace(go.Bar(
             name='Sémantique (50%)',
-            x=df['Film'],
-            y=df['Sémantique'] * 0.5,
+            x=films,
+            y=weighted[:, 0],
             marker_color='rgb(255, 107, 107)'
         ))
-        
+
         fig.add_trace(go.Bar(
             name='Genre (30%)',
-            x=df['Film'],
-            y=df['Genre'] * 0.3,
+            x=films,
+            y=weighted[:, 1],
             marker_color='rgb(78, 205, 196)'
         ))
-        
+
         fig.add_trace(go.Bar(
             name='Mood (20%)',
-            x=df['Film'],
-            y=df['Mood'] * 0.2,
+            x=films,
+            y=weighted[:, 2],
             marker_color='rgb(255, 230, 109)'
         ))
         
@@ -199,28 +330,76 @@ class VisualizationManager:
             st.info("Aucune distribution de genre disponible")
             return
         
-        df = pd.DataFrame([
-            {'Genre': genre, 'Affinité': score}
-            for genre, score in sorted(genre_scores.items(), key=lambda x: x[1], reverse=True)
-        ])
-        
-        fig = px.bar(
-            df,
-            x='Genre',
-            y='Affinité',
-            color='Affinité',
-            color_continuous_scale='RdYlGn',
-            title=title
-        )
-        
+        # Tri par argsort sur arrays NumPy : ni sorted() Python ni DataFrame
+        genres = np.asarray(list(genre_scores.keys()))
+        scores = np.fromiter(genre_scores.values(), dtype=np.float32, count=len(genre_scores))
+        order = np.argsort(-scores)
+
+        # go.Bar direct : évite la construction de DataFrame interne et la
+        # validation de templates de px.bar pour un simple graphique coloré
+        fig = go.Figure(go.Bar(
+            x=genres[order],
+            y=scores[order],
+            marker=dict(
+                color=scores[order],
+                colorscale='RdYlGn',
+                showscale=True,
+                cmin=0, cmax=1,
+                colorbar=dict(title='Affinité')
+            )
+        ))
+
         fig.update_layout(
+            title=title,
             height=400,
-            xaxis_tickangle=-45,
-            yaxis=dict(range=[0, 1])
+            xaxis=dict(title='Genre', tickangle=-45),
+            yaxis=dict(title='Affinité', range=[0, 1])
         )
         
         st.plotly_chart(fig, use_container_width=True)
     
+    def build_dashboard(
+        self,
+        genre_weights: Dict[str, float],
+        mood_weights: Dict[str, float],
+        recommendations: List[Dict],
+        genre_scores: Dict[str, float]
+    ) -> go.Figure:
+        """
+        Construit le tableau de bord complet en une seule figure Plotly
+
+        Les quatre graphiques de l'onglet visualisations sont regroupés via
+        make_subplots : une seule sérialisation JSON et un seul message vers
+        le frontend au lieu de quatre figures indépendantes. La construction
+        est déléguée à _cached_dashboard, mémoïsée sur des clés tuples.
+        """
+        rec_rows = tuple(
+            (
+                f"{r['titre']} ({r['annee']})",
+                r['composantes']['sémantique'],
+                r['composantes']['genre'],
+                r['composantes']['mood']
+            )
+            for r in recommendations[:3]
+        )
+        return _cached_dashboard(
+            tuple(genre_weights.items()),
+            tuple(mood_weights.items()),
+            rec_rows,
+            tuple(genre_scores.items())
+        )
+
+    def render_dashboard(
+        self,
+        genre_weights: Dict[str, float],
+        mood_weights: Dict[str, float],
+        recommendations: List[Dict],
+        genre_scores: Dict[str, float]
+    ):
+        """Affiche le tableau de bord combiné en un seul st.plotly_chart"""
+        fig = self.build_dashboard(genre_weights, mood_weights, recommendations, genre_scores)
+        st.plotly_chart(fig, use_container_width=True)
+
     def display_film_card(self, film: Dict, rank: int):
         """
         Affiche une carte détaillée pour un film
@@ -232,33 +411,45 @@ class VisualizationManager:
         # Émojis de médailles
         medals = {1: "1.", 2: "2.", 3: "3."}
         medal = medals.get(rank, "")
-        
-        with st.container():
-            st.markdown(f"### {medal} #{rank} - {film['titre']}")
-            
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                st.markdown(f"**Réalisateur:** {film['realisateur']}")
-                st.markdown(f"**Année:** {film['annee']}")
-                st.markdown(f"**Genre:** {film['genre']}")
-                st.markdown(f"**Ambiance:** {film['mood']}")
-                
-                st.markdown("**Synopsis:**")
-                st.write(film['description'])
-                
-                st.markdown(f"**Mots-clés:** `{film['keywords']}`")
-            
-            with col2:
-                # Scores
-                st.metric("Score Final", f"{film['score_final']:.2%}")
-                
-                st.markdown("**Composantes:**")
-                st.progress(film['composantes']['sémantique'], text=f"Sémantique: {film['composantes']['sémantique']:.2%}")
-                st.progress(film['composantes']['genre'], text=f"Genre: {film['composantes']['genre']:.2%}")
-                st.progress(film['composantes']['mood'], text=f"Mood: {film['composantes']['mood']:.2%}")
-            
-            st.markdown("---")
+
+        # Carte entière rendue en un seul st.markdown : un message protobuf
+        # et une réconciliation DOM au lieu d'une dizaine de widgets par film
+        composantes = film['composantes']
+        bars = "".join(
+            f"<div style='margin-bottom:0.4rem;'>"
+            f"<div style='font-size:0.8rem; color:#64748b;'>{label}: {value:.2%}</div>"
+            f"<div style='background:#e2e8f0; border-radius:4px; height:8px;'>"
+            f"<div style='background:{color}; border-radius:4px; height:8px; width:{min(value, 1.0) * 100:.1f}%;'></div>"
+            f"</div></div>"
+            for label, value, color in (
+                ('Sémantique', composantes['sémantique'], '#FF6B6B'),
+                ('Genre', composantes['genre'], '#4ECDC4'),
+                ('Mood', composantes['mood'], '#FFE66D')
+            )
+        )
+
+        st.markdown(
+            f"""<div style='margin-bottom:1rem; border-bottom:1px solid #e2e8f0; padding-bottom:1rem;'>
+<h3>{medal} #{rank} - {_escape(film['titre'])}</h3>
+<div style='display:flex; gap:2rem;'>
+<div style='flex:2;'>
+<p><strong>Réalisateur:</strong> {_escape(film['realisateur'])}<br>
+<strong>Année:</strong> {film['annee']}<br>
+<strong>Genre:</strong> {_escape(film['genre'])}<br>
+<strong>Ambiance:</strong> {_escape(film['mood'])}</p>
+<p><strong>Synopsis:</strong><br>{_escape(film['description'])}</p>
+<p><strong>Mots-clés:</strong> <code>{_escape(film['keywords'])}</code></p>
+</div>
+<div style='flex:1;'>
+<div style='font-size:0.85rem; color:#64748b;'>Score Final</div>
+<div style='font-size:1.8rem; font-weight:700;'>{film['score_final']:.2%}</div>
+<p><strong>Composantes:</strong></p>
+{bars}
+</div>
+</div>
+</div>""",
+            unsafe_allow_html=True
+        )
     
     def display_coverage_stats(self, stats: Dict):
         """
@@ -267,33 +458,42 @@ class VisualizationManager:
         Args:
             stats: Dictionnaire des statistiques
         """
+        # Formatage mémoïsé : les f-strings ne sont recalculées que si les
+        # stats changent, les st.metric reçoivent des chaînes prêtes
+        formatted = _format_coverage(tuple(
+            (k, stats[k]) for k in (
+                'score_moyen', 'films_haute_affinite',
+                'films_affinite_moyenne', 'films_faible_affinite'
+            )
+        ))
+
         col1, col2, col3, col4 = st.columns(4)
-        
+
         with col1:
             st.metric(
                 "Score Moyen",
-                f"{stats['score_moyen']:.2%}",
+                formatted['score_moyen'],
                 help="Affinité moyenne avec l'ensemble du catalogue"
             )
-        
+
         with col2:
             st.metric(
                 "Haute Affinité",
-                stats['films_haute_affinite'],
+                formatted['haute'],
                 help="Films avec score > 70%"
             )
-        
+
         with col3:
             st.metric(
                 "Affinité Moyenne",
-                stats['films_affinite_moyenne'],
+                formatted['moyenne'],
                 help="Films avec score 50-70%"
             )
-        
+
         with col4:
             st.metric(
                 "À Découvrir",
-                stats['films_faible_affinite'],
+                formatted['faible'],
                 help="Films avec score < 50% (nouveaux horizons)"
             )
     
@@ -305,27 +505,34 @@ class VisualizationManager:
             api_stats: Statistiques de l'API
         """
         st.markdown("###  Utilisation de l'API GenAI")
-        
+
+        cache_stats = api_stats['cache_stats']
+        formatted = _format_api_usage(
+            api_stats['api_calls_count'],
+            cache_stats['entries'],
+            cache_stats['max_size'],
+            cache_stats['usage_percent']
+        )
+
         col1, col2, col3 = st.columns(3)
-        
+
         with col1:
             st.metric(
                 "Appels API",
-                api_stats['api_calls_count'],
+                formatted['calls'],
                 help="Nombre d'appels effectués à Gemini"
             )
-        
+
         with col2:
-            cache_stats = api_stats['cache_stats']
             st.metric(
                 "Entrées en Cache",
-                f"{cache_stats['entries']}/{cache_stats['max_size']}",
+                formatted['cache'],
                 help="Réponses mises en cache pour réutilisation"
             )
-        
+
         with col3:
             st.metric(
                 "Taux d'Utilisation Cache",
-                f"{cache_stats['usage_percent']:.1f}%",
+                formatted['usage'],
                 help="Pourcentage du cache utilisé"
             )